@@ -0,0 +1,242 @@
+"""
+Headless JSON API over the scrape pipeline.
+
+  GET /events/{id}/poules    pool bouts (with the "Score" string)
+  GET /events/{id}/summary   poules summary
+  GET /events/{id}/tableau   tableau matches
+  GET /events/{id}/fencers   tableau fencers
+
+{id} is the FencingTimeLive event id; the page scraped is {site}/events/view/{id}.
+Concurrent requests for the same event share a single scrape (single-flight).
+Results are cached in memory and on disk for --ttl seconds and served with an
+ETag, so clients revalidating with If-None-Match get a 304 without a body.
+Completed events (see completion.py) never expire and are not scraped again.
+Every scrape also appends its changed rows to the event's snapshot under
+--snapshot-dir (see snapshot.py).
+
+Usage:
+  python api.py --port 8080 --cache-dir .ftl_cache --ttl 300 --workers 2
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from capture import DEFAULT_CAPTURE, CAPTURE_BACKENDS
+from discovery import ManifestCache
+from schema import with_score_column
+from scraper import scrape_event
+from snapshot import DEFAULT_ROOT, SnapshotStore
+
+DEFAULT_SITE = "https://www.fencingtimelive.com"
+EVENT_URL = "{site}/events/view/{event_id}"
+ROUTE = re.compile(r'^/events/(?P<event_id>[A-Za-z0-9]+)/(?P<endpoint>poules|summary|tableau|fencers)/?$')
+ENDPOINT_FRAMES = {"poules": "poules", "summary": "summary", "tableau": "matches", "fencers": "fencers"}
+REASONS = {200: "OK", 304: "Not Modified", 404: "Not Found", 405: "Method Not Allowed", 502: "Bad Gateway"}
+
+
+def render_bodies(frames):
+    """Serializes the scraped frames to one JSON body (bytes) per endpoint."""
+    frames = dict(frames, poules=with_score_column(frames["poules"]))
+    return {
+        endpoint: frames[frame].to_json(orient="records").encode("utf-8")
+        for endpoint, frame in ENDPOINT_FRAMES.items()
+    }
+
+
+PERMANENT_MAX_AGE = 365 * 24 * 3600
+
+
+class CachedEvent:
+    def __init__(self, fetched, bodies, complete=False):
+        self.fetched = fetched
+        self.bodies = bodies
+        self.complete = complete
+        self.etags = {endpoint: '"' + hashlib.sha1(body).hexdigest() + '"' for endpoint, body in bodies.items()}
+
+
+class EventCache:
+    """
+    Two-level cache of rendered event bodies: a dict in memory backed by one
+    directory per event under cache_dir (meta.json plus one <endpoint>.json each).
+    """
+
+    def __init__(self, cache_dir, ttl):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.memory = {}
+
+    def fresh(self, entry):
+        return entry is not None and (entry.complete or time.time() - entry.fetched < self.ttl)
+
+    def remaining(self, entry):
+        if entry.complete:
+            return PERMANENT_MAX_AGE
+        return max(0, int(self.ttl - (time.time() - entry.fetched)))
+
+    def get_memory(self, event_id):
+        entry = self.memory.get(event_id)
+        return entry if self.fresh(entry) else None
+
+    def read_disk(self, event_id):
+        """Loads a fresh entry from disk (blocking), or returns None."""
+        path = os.path.join(self.cache_dir, event_id)
+        try:
+            with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            bodies = {}
+            for endpoint in ENDPOINT_FRAMES:
+                with open(os.path.join(path, f"{endpoint}.json"), "rb") as f:
+                    bodies[endpoint] = f.read()
+        except (OSError, ValueError, KeyError):
+            return None
+        entry = CachedEvent(meta["fetched"], bodies, meta.get("complete", False))
+        return entry if self.fresh(entry) else None
+
+    def write_disk(self, event_id, entry):
+        """Writes an entry to disk (blocking); each file is replaced atomically."""
+        path = os.path.join(self.cache_dir, event_id)
+        os.makedirs(path, exist_ok=True)
+        files = {f"{endpoint}.json": body for endpoint, body in entry.bodies.items()}
+        files["meta.json"] = json.dumps({"fetched": entry.fetched, "complete": entry.complete}).encode("utf-8")
+        for name, data in files.items():
+            tmp = os.path.join(path, name + ".tmp")
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, os.path.join(path, name))
+
+    def remember(self, event_id, entry):
+        self.memory[event_id] = entry
+
+
+class EventService:
+    """
+    Resolves events from the cache, merging concurrent misses into one scrape.
+    manifest_cache (a discovery.ManifestCache) is shared by every scrape, so
+    rescraping a stale event skips its discovery page load; snapshots (a
+    snapshot.SnapshotStore) versions every scrape.
+    """
+
+    def __init__(self, cache, site=DEFAULT_SITE, capture=DEFAULT_CAPTURE, workers=2, manifest_cache=None,
+                 snapshots=None):
+        self.cache = cache
+        self.manifest_cache = manifest_cache
+        self.snapshots = snapshots
+        self.site = site.rstrip("/")
+        self.capture = capture
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.inflight = {}
+
+    async def get_event(self, event_id):
+        entry = self.cache.get_memory(event_id)
+        if entry is not None:
+            return entry
+        task = self.inflight.get(event_id)
+        if task is None:
+            task = asyncio.ensure_future(self._load(event_id))
+            self.inflight[event_id] = task
+            task.add_done_callback(lambda _: self.inflight.pop(event_id, None))
+        # shield: one client disconnecting must not cancel the scrape the others wait on
+        return await asyncio.shield(task)
+
+    async def _load(self, event_id):
+        loop = asyncio.get_running_loop()
+        entry = await loop.run_in_executor(self.executor, self.cache.read_disk, event_id)
+        if entry is None:
+            entry = await loop.run_in_executor(self.executor, self._scrape, event_id)
+        self.cache.remember(event_id, entry)
+        return entry
+
+    def _scrape(self, event_id):
+        frames = scrape_event(EVENT_URL.format(site=self.site, event_id=event_id), self.capture,
+                              manifest_cache=self.manifest_cache, event_id=event_id)
+        if self.snapshots is not None:
+            self.snapshots.write(event_id, frames)
+        entry = CachedEvent(time.time(), render_bodies(frames), frames["complete"])
+        self.cache.write_disk(event_id, entry)
+        return entry
+
+    async def respond(self, method, target, headers):
+        """Returns (status, body, extra_headers) for one request."""
+        if method not in ("GET", "HEAD"):
+            return 405, json.dumps({"error": "method not allowed"}).encode("utf-8"), {}
+        m = ROUTE.match(target.split("?", 1)[0])
+        if not m:
+            return 404, json.dumps({"error": "not found"}).encode("utf-8"), {}
+        try:
+            entry = await self.get_event(m.group("event_id"))
+        except Exception as e:
+            return 502, json.dumps({"error": f"scrape failed: {e}"}).encode("utf-8"), {}
+        endpoint = m.group("endpoint")
+        etag = entry.etags[endpoint]
+        cache_control = f"max-age={self.cache.remaining(entry)}" + (", immutable" if entry.complete else "")
+        extra = {"ETag": etag, "Cache-Control": cache_control}
+        if etag in [t.strip() for t in headers.get("if-none-match", "").split(",")]:
+            return 304, b"", extra
+        return 200, entry.bodies[endpoint], extra
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                status, body, extra = await self.respond(method, target, headers)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                head = [f"HTTP/1.1 {status} {REASONS[status]}",
+                        "Content-Type: application/json",
+                        f"Content-Length: {len(body)}",
+                        "Connection: " + ("keep-alive" if keep_alive else "close")]
+                head += [f"{key}: {value}" for key, value in extra.items()]
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+                if method != "HEAD":
+                    writer.write(body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(service, host, port):
+    server = await asyncio.start_server(service.handle, host, port)
+    print(f"Serving event API on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON API over the FencingTimeLive scraper.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--site", default=DEFAULT_SITE, help="site root, e.g. a local mock_server.py")
+    parser.add_argument("--cache-dir", default=".ftl_cache")
+    parser.add_argument("--ttl", type=float, default=300.0, help="seconds a scraped event stays fresh")
+    parser.add_argument("--workers", type=int, default=2, help="concurrent scrapes")
+    parser.add_argument("--capture", choices=CAPTURE_BACKENDS, default=DEFAULT_CAPTURE)
+    parser.add_argument("--snapshot-dir", default=os.environ.get("FTL_SNAPSHOT_DIR", DEFAULT_ROOT))
+    args = parser.parse_args()
+    manifests = ManifestCache(os.path.join(args.cache_dir, "manifests"), args.ttl)
+    service = EventService(EventCache(args.cache_dir, args.ttl), args.site, args.capture, args.workers, manifests,
+                           SnapshotStore(args.snapshot_dir))
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
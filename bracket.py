@@ -0,0 +1,216 @@
+"""
+Helpers shared by app.py and tableau.py for turning the scraped tableau
+(elimination bracket) into the matches and fencers tables.
+"""
+import re
+import pandas as pd
+from bs4 import BeautifulSoup
+
+SEED_PATTERN = re.compile(r'^\(\d+\)')
+
+# "(48) PROKHODOV Kirill KAZ" -> seed, name, nationality
+FENCER_WITH_NATION = r'^\((?P<Seed>\d+)\)\s*(?P<Name>.*?)\s+(?P<Nationality>[A-Z]{3})$'
+# "(48) PROKHODOV Kirill" -> seed, name (no nationality)
+FENCER_WITHOUT_NATION = r'^\((?P<Seed>\d+)\)\s*(?P<Name>.*)$'
+
+
+def split_fencer_column(series):
+    """
+    Vectorized version of parse_fencer over a whole column of "(seed) NAME NAT"
+    strings. Returns a DataFrame with Name, Seed and Nationality columns:
+      - strings with a trailing 3-letter nation give (name, seed, nation),
+      - strings with only a seed give (name, seed, ""),
+      - anything else (e.g. "BYE" or "") is kept as the name with "" seed/nation.
+    """
+    s = series.fillna("").astype(str)
+    full = s.str.extract(FENCER_WITH_NATION)
+    partial = s.str.extract(FENCER_WITHOUT_NATION)
+    has_full = full["Seed"].notna()
+    has_partial = partial["Seed"].notna()
+    name = full["Name"].str.strip().where(has_full, partial["Name"].str.strip().where(has_partial, s))
+    return pd.DataFrame({
+        "Name": name,
+        "Seed": partial["Seed"].fillna(""),
+        "Nationality": full["Nationality"].fillna(""),
+    }, index=series.index)
+
+
+def split_fencers(df_matches):
+    """
+    Splits the raw Fencer1/Fencer2 strings of the matches table into clean names
+    plus Fencer1_Seed/Fencer1_Nationality (and the same for Fencer2), and reduces
+    Winner to the winner's clean name. Returns a new DataFrame.
+    """
+    df = df_matches.copy()
+    for col in ("Fencer1", "Fencer2"):
+        parts = split_fencer_column(df[col])
+        df[col] = parts["Name"]
+        df[f"{col}_Seed"] = parts["Seed"]
+        df[f"{col}_Nationality"] = parts["Nationality"]
+    df["Winner"] = split_fencer_column(df["Winner"])["Name"]
+    return df
+
+
+def build_fencers_table(df_matches):
+    """
+    Given a matches table already passed through split_fencers, returns the unique
+    fencers (Name, Nationality, Seed) sorted by seed. Entries without a nationality
+    (BYEs, empty slots) are dropped.
+    """
+    columns = ["Name", "Nationality", "Seed"]
+    df_fencers = pd.concat([
+        df_matches[["Fencer1", "Fencer1_Nationality", "Fencer1_Seed"]].set_axis(columns, axis=1),
+        df_matches[["Fencer2", "Fencer2_Nationality", "Fencer2_Seed"]].set_axis(columns, axis=1),
+    ], ignore_index=True).drop_duplicates()
+    df_fencers = df_fencers[df_fencers["Nationality"].str.strip() != ""].copy()
+    df_fencers["Seed"] = df_fencers["Seed"].astype(int)
+    return df_fencers.sort_values(["Seed", "Name"]).reset_index(drop=True)
+
+
+def dedup_columns(columns):
+    seen = {}
+    new_cols = []
+    for col in columns:
+        if col in seen:
+            seen[col] += 1
+            new_cols.append(f"{col}_{seen[col]}")
+        else:
+            seen[col] = 0
+            new_cols.append(col)
+    return new_cols
+
+
+def _bracket_rows(html):
+    """
+    Locates the elimTableau table and returns (header, rows) where header is the
+    text of the first row with <th> cells (padded with "" to the widest row) and
+    rows is a list of the direct <td>/<th> cells of every other row.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    table = soup.find("table", class_="elimTableau")
+    if not table:
+        raise Exception("Could not find the bracket table with class 'elimTableau'.")
+    header = None
+    rows = []
+    for row in table.find_all("tr"):
+        if header is None:
+            ths = row.find_all("th", recursive=False)
+            if ths:
+                header = [th.get_text(strip=True) for th in ths]
+                continue
+        rows.append(row.find_all(["td", "th"], recursive=False))
+    header = header or []
+    max_cols = max([len(header)] + [len(cells) for cells in rows])
+    header.extend([""] * (max_cols - len(header)))
+    return header, rows
+
+
+def _cell_text(cells, index):
+    return cells[index].get_text(separator=" ", strip=True) if index < len(cells) else ""
+
+
+def extract_full_bracket_table(html):
+    """
+    Parses the bracket HTML and returns a tuple (header, matrix) where:
+      - header is a list of column names from the first row with <th> tags.
+      - matrix is a list of rows (each row is a list of strings for each column),
+        padded to the maximum number of cells found in any row.
+    Blank cells are preserved.
+    """
+    header, rows = _bracket_rows(html)
+    matrix = [[_cell_text(cells, i) for i in range(len(header))] for cells in rows]
+    return header, matrix
+
+
+class BracketAssembler:
+    """
+    Assembles the full bracket from the partial windows the tableau page shows
+    while it is navigated with prevBut/nextBut.
+
+    Round columns are kept keyed by their (deduplicated) header. Each new page only
+    has the text of the columns not seen before (or seen but still empty) extracted,
+    and those are placed next to their neighbours on the page so the rounds stay in
+    bracket order whichever direction they were revealed from.
+
+    A page adding nothing new does not mean navigation is exhausted: after moving
+    back to the first rounds, the first nextBut clicks only show columns already
+    seen. Navigation in a direction ends when a click leaves the visible headers
+    unchanged (compare last_headers before and after), or at final_reached.
+    """
+
+    def __init__(self):
+        self.columns = {}
+        self.order = []
+        self.last_headers = None   # headers of the most recent page, to detect a click that changed nothing
+        self._blank_headers = set()
+
+    def add_page(self, html):
+        """
+        Merges the columns visible in the given page source. Returns the list of
+        headers that were added or filled by this page (possibly empty when the
+        page only shows columns already seen).
+        """
+        header, rows = _bracket_rows(html)
+        page_headers = dedup_columns(header)
+        self.last_headers = page_headers
+        labeled = max((i for i, text in enumerate(header) if text.strip()), default=-1)
+        added = []
+        for index, col in enumerate(page_headers):
+            if col in self.columns and any(self.columns[col]):
+                continue
+            if index > labeled and not self._winner_column(rows, index, labeled):
+                continue  # blank header padding right of the labeled rounds
+            values = [_cell_text(cells, index) for cells in rows]
+            if col in self.columns:
+                if not any(values):
+                    continue
+                # A column seen empty before is filled now: re-place it where this page shows it.
+                self.order.remove(col)
+            self._insert(col, page_headers, index)
+            self.columns[col] = values
+            if not header[index].strip():
+                self._blank_headers.add(col)
+            added.append(col)
+        return added
+
+    @staticmethod
+    def _winner_column(rows, index, labeled):
+        """True for the first unlabeled column right of a labeled final (two seeded fencers)."""
+        if index != labeled + 1 or labeled < 0:
+            return False
+        return sum(1 for cells in rows if SEED_PATTERN.match(_cell_text(cells, labeled))) == 2
+
+    def _insert(self, col, page_headers, index):
+        for right in page_headers[index + 1:]:
+            if right in self.order:
+                self.order.insert(self.order.index(right), col)
+                return
+        for left in reversed(page_headers[:index]):
+            if left in self.order:
+                self.order.insert(self.order.index(left) + 1, col)
+                return
+        self.order.append(col)
+
+    def _seeded(self, col):
+        return sum(1 for value in self.columns[col] if SEED_PATTERN.match(value))
+
+    @property
+    def final_reached(self):
+        """
+        True once the rightmost assembled column is unlabeled, holds a seeded winner
+        and sits right of the final (a column with exactly two seeded fencers). Short
+        header rows are padded with blank headers, so a blank header alone does not
+        mark the winner column; add_page skips such padding columns altogether.
+        """
+        if len(self.order) < 2:
+            return False
+        final, winner = self.order[-2], self.order[-1]
+        return winner in self._blank_headers and self._seeded(winner) >= 1 and self._seeded(final) == 2
+
+    def to_frame(self):
+        """Returns the assembled bracket as a DataFrame, shorter columns padded with ""."""
+        length = max((len(values) for values in self.columns.values()), default=0)
+        return pd.DataFrame({
+            col: self.columns[col] + [""] * (length - len(self.columns[col]))
+            for col in self.order
+        })
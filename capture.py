@@ -0,0 +1,161 @@
+"""
+Chrome driver creation and network capture backends used to discover the
+per-pool ("dbut=true") URLs requested by the pools page.
+
+Two backends are available:
+  - "devtools": a plain selenium driver; responses are read from the Chrome
+    DevTools performance log as it streams and everything not matching the URL
+    filter is dropped straight away. No proxy is involved.
+  - "wire": selenium-wire, which routes all traffic through its mitmproxy. Its
+    capture is limited to WIRE_SCOPES (pool sheets and tableau pages) and the
+    captured requests are drained and cleared while waiting, so driver.requests
+    stays small however long the driver lives.
+
+check_memory() warns when the process grows past FTL_MEMORY_LIMIT_MB;
+memory_warning() returns the same message for callers that show it to the user.
+"""
+import json
+import os
+import resource
+import sys
+import time
+import warnings
+from selenium.webdriver.chrome.options import Options as ChromeOptions
+from selenium.webdriver.chrome.service import Service as ChromeService
+from webdriver_manager.chrome import ChromeDriverManager
+
+DEFAULT_CAPTURE = "devtools"
+CAPTURE_BACKENDS = ("devtools", "wire")
+POOL_URL_FILTER = "dbut=true"
+# Only these URLs are stored by selenium-wire; everything else passes through uncaptured.
+WIRE_SCOPES = [r".*dbut=true.*", r".*/tableaus/.*"]
+WIRE_OPTIONS = {
+    # Bounded in-memory storage instead of the default disk storage (selenium-wire >= 4.3).
+    "request_storage": "memory",
+    "request_storage_max_size": 200,
+}
+MEMORY_LIMIT_MB = float(os.environ.get("FTL_MEMORY_LIMIT_MB", "1024"))
+
+
+def rss_mb():
+    """Resident memory of this process in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def memory_warning(stage, limit_mb=None):
+    """The warning for a process above the memory ceiling after `stage`, or None."""
+    limit_mb = MEMORY_LIMIT_MB if limit_mb is None else limit_mb
+    current = rss_mb()
+    if current > limit_mb:
+        return f"Memory use {current:.0f} MB after {stage} exceeds the {limit_mb:.0f} MB ceiling."
+    return None
+
+
+def check_memory(stage, limit_mb=None):
+    """Warns if the process is above the memory ceiling; returns the current RSS in MB."""
+    message = memory_warning(stage, limit_mb)
+    if message:
+        warnings.warn(message)
+    return rss_mb()
+
+
+def get_chrome_driver(capture=DEFAULT_CAPTURE):
+    if capture not in CAPTURE_BACKENDS:
+        raise ValueError(f"Unknown capture backend {capture!r}, expected one of {CAPTURE_BACKENDS}.")
+    chrome_options = ChromeOptions()
+    chrome_options.add_argument('--headless')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    # Performance logging feeds the "devtools" capture backend
+    chrome_options.set_capability("goog:loggingPrefs", {'performance': 'ALL'})
+
+    #driver_version="120.0.6099.224"
+    service = ChromeService(ChromeDriverManager(driver_version="120.0.6099.224").install())
+    if capture == "wire":
+        from seleniumwire import webdriver  # Selenium Wire captures network requests
+        driver = webdriver.Chrome(service=service, options=chrome_options, seleniumwire_options=WIRE_OPTIONS)
+        driver.scopes = WIRE_SCOPES
+    else:
+        from selenium import webdriver
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+    return driver
+
+
+def _devtools_response_urls(entries, url_filter):
+    """
+    Yields the URLs of Network.responseReceived events matching url_filter.
+    Entries are checked with a substring test before any JSON decoding, so
+    unrelated traffic is discarded without being parsed.
+    """
+    for entry in entries:
+        message = entry.get("message", "")
+        if url_filter not in message or "Network.responseReceived" not in message:
+            continue
+        try:
+            event = json.loads(message)["message"]
+        except (ValueError, KeyError):
+            continue
+        if event.get("method") != "Network.responseReceived":
+            continue
+        url = event.get("params", {}).get("response", {}).get("url", "")
+        if url_filter in url:
+            yield url
+
+
+def capture_devtools_urls(driver, url_filter=POOL_URL_FILTER, max_wait=10, interval=1):
+    """
+    Drains the performance log until the page stops producing network events
+    (or max_wait seconds pass) and returns the matching response URLs in order.
+    Each get_log call empties the browser-side buffer, so nothing accumulates.
+    """
+    urls = _devtools_response_urls(driver.get_log("performance"), url_filter)
+    urls = list(urls)
+    elapsed = 0
+    while elapsed < max_wait:
+        time.sleep(interval)
+        elapsed += interval
+        entries = driver.get_log("performance")
+        if not entries:
+            break
+        urls.extend(_devtools_response_urls(entries, url_filter))
+    return urls
+
+
+def capture_wire_urls(driver, url_filter=POOL_URL_FILTER, max_wait=10, interval=1):
+    """
+    Returns the URLs of captured requests with a response matching url_filter.
+    Every interval the captured requests are harvested and cleared (once none is
+    still waiting for its response); capture stops when an interval adds nothing
+    new or after max_wait seconds. driver.requests is left empty.
+    """
+    urls = []
+    elapsed = 0
+    while elapsed < max_wait:
+        time.sleep(interval)
+        elapsed += interval
+        captured = driver.requests
+        if not captured:
+            break
+        if all(request.response for request in captured):
+            urls.extend(request.url for request in captured if url_filter in request.url)
+            del driver.requests
+    urls.extend(request.url for request in driver.requests
+                if request.response and url_filter in request.url)
+    del driver.requests
+    return urls
+
+
+def capture_urls(driver, capture=DEFAULT_CAPTURE, url_filter=POOL_URL_FILTER, max_wait=10, interval=1):
+    """Returns the de-duplicated response URLs matching url_filter using the given backend."""
+    if capture == "wire":
+        urls = capture_wire_urls(driver, url_filter, max_wait, interval)
+    else:
+        urls = capture_devtools_urls(driver, url_filter, max_wait, interval)
+    check_memory("pool URL capture")
+    return list(dict.fromkeys(urls))
@@ -0,0 +1,47 @@
+"""
+Event completion detection from the data a scrape already parses.
+
+An event is complete when every one of its phases was scraped and
+  - each tableau's final has a winner (the "Winner" column of the assembled
+    bracket holds a fencer, which is what gives the final's match a Winner), and
+  - in each pool round every captured pool was fetched, parsed and is complete: no empty cell off
+    the diagonal of any pool's results matrix (the "Complete" column of the pool
+    checks, which is False for pools that failed to fetch).
+
+Complete events no longer change, so the API cache and the Streamlit job queue
+keep them indefinitely instead of scraping them again.
+"""
+
+
+def tableau_complete(df_matches):
+    """
+    True when the last round of the tableau is a single match whose winner was found
+    in the following "Winner" round column (the matches table leaves the winner empty
+    when no such column was reached), and that winner is one of the two finalists.
+    """
+    if df_matches is None or df_matches.empty:
+        return False
+    last_round = df_matches[df_matches["Round"].astype(str) == str(df_matches["Round"].iloc[-1])]
+    if len(last_round) != 1:
+        return False
+    final = last_round.astype(object).fillna("").astype(str).iloc[0]
+    winner = final["Winner"].strip()
+    return winner != "" and winner in (final["Fencer1"].strip(), final["Fencer2"].strip())
+
+
+def pools_complete(df_pool_checks):
+    """
+    True when pools were captured and every one of them was parsed and has all its
+    bouts; df_pool_checks holds one row per captured pool URL, with failed ones incomplete.
+    """
+    return (df_pool_checks is not None and not df_pool_checks.empty
+            and bool(df_pool_checks["Complete"].all()))
+
+
+def event_complete(phases):
+    """True when every phase (as returned by discovery.scrape_manifest) was scraped and is complete."""
+    return bool(phases) and all(
+        "frames" in phase and (tableau_complete(phase["frames"]["matches"]) if phase["kind"] == "tableaus"
+                               else pools_complete(phase["frames"]["pool_checks"]))
+        for phase in phases
+    )
@@ -0,0 +1,223 @@
+"""
+Tournament and event discovery: one page load lists every phase to scrape.
+
+discover() loads a tournament or event page once and collects every link to
+  /events/view/<event>                 events,
+  /pools/scores/<event>/<round>        pool rounds,
+  /tableaus/scores/<event>/<tableau>   tableaus,
+into a manifest grouped by event. Events listed on a tournament page without
+their phases are loaded once each, concurrently. Manifests are cached on disk
+for `ttl` seconds, so repeated scrapes of a tournament skip discovery.
+
+scrape_manifest() then fetches every pool round and tableau of the manifest
+concurrently instead of only the first link of each kind; scraper.scrape_event
+does this for the event behind the page it is given.
+
+Usage:
+  python discovery.py URL                       print the manifest
+  python discovery.py URL --scrape --out DIR    scrape every phase into CSV files
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from capture import DEFAULT_CAPTURE, get_chrome_driver
+
+EVENT_LINK = re.compile(r'/events/view/(?P<event>[A-Za-z0-9]+)')
+PHASE_LINKS = {
+    "pools": re.compile(r'/pools/scores/(?P<event>[A-Za-z0-9]+)/(?P<phase>[A-Za-z0-9]+)'),
+    "tableaus": re.compile(r'/tableaus/scores/(?P<event>[A-Za-z0-9]+)/(?P<phase>[A-Za-z0-9]+)'),
+}
+LINK_SELECTOR = "a[href*='/events/view/'], a[href*='/pools/scores/'], a[href*='/tableaus/scores/']"
+DEFAULT_CACHE_DIR = os.path.join(".ftl_cache", "manifests")
+
+
+def load_page(url, wait=20):
+    """Page source of url once its event/phase links are present (or after `wait` seconds)."""
+    driver = get_chrome_driver()
+    try:
+        driver.get(url)
+        try:
+            WebDriverWait(driver, wait).until(EC.presence_of_element_located((By.CSS_SELECTOR, LINK_SELECTOR)))
+        except Exception:
+            pass  # a page without links yields an empty manifest
+        return driver.page_source
+    finally:
+        driver.quit()
+
+
+def parse_links(html, page_url):
+    """
+    Returns (events, phases): events maps event id -> {"id", "name", "url"} and phases
+    is a list of {"kind", "event", "id", "name", "url"}, both in page order without duplicates.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    events = {}
+    phases = {}
+    for link in soup.find_all("a", href=True):
+        url = urljoin(page_url, link["href"])
+        name = link.get_text(" ", strip=True)
+        m = EVENT_LINK.search(url)
+        if m and m.group("event") not in events:
+            events[m.group("event")] = {"id": m.group("event"), "name": name, "url": url}
+            continue
+        for kind, pattern in PHASE_LINKS.items():
+            m = pattern.search(url)
+            if m and (kind, m.group("phase")) not in phases:
+                phases[kind, m.group("phase")] = {"kind": kind, "event": m.group("event"),
+                                                  "id": m.group("phase"), "name": name, "url": url}
+    return events, list(phases.values())
+
+
+def build_manifest(url, events, phases):
+    """Groups phases by event: {"url", "fetched", "events": [{id, name, url, pools, tableaus}]}."""
+    by_event = {}
+    for event_id, event in events.items():
+        by_event[event_id] = dict(event, pools=[], tableaus=[])
+    for phase in phases:
+        event = by_event.setdefault(phase["event"], {"id": phase["event"], "name": "", "url": None,
+                                                     "pools": [], "tableaus": []})
+        event[phase["kind"]].append({key: phase[key] for key in ("id", "name", "url")})
+    return {"url": url, "fetched": time.time(), "events": list(by_event.values())}
+
+
+class ManifestCache:
+    """One JSON file per discovered URL under cache_dir, fresh for `ttl` seconds."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl=600):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+
+    def _path(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, url):
+        try:
+            with open(self._path(url), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return manifest if time.time() - manifest.get("fetched", 0) < self.ttl else None
+
+    def put(self, url, manifest):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(url)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, path)
+
+
+def discover(url, cache=None, workers=2, load=load_page):
+    """
+    Manifest of every event, pool round and tableau reachable from a tournament or
+    event page. The page is loaded once; events it lists without their phases are
+    loaded concurrently (at most `workers` browsers). cache is a ManifestCache or None.
+    """
+    if cache is not None:
+        manifest = cache.get(url)
+        if manifest is not None:
+            return manifest
+    events, phases = parse_links(load(url), url)
+    with_phases = {phase["event"] for phase in phases}
+    pending = [event for event_id, event in events.items() if event_id not in with_phases]
+    if pending:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pages = list(executor.map(load, [event["url"] for event in pending]))
+        known = {(phase["kind"], phase["id"]) for phase in phases}
+        for event, html in zip(pending, pages):
+            for phase in parse_links(html, event["url"])[1]:
+                if (phase["kind"], phase["id"]) not in known:
+                    known.add((phase["kind"], phase["id"]))
+                    phases.append(phase)
+    manifest = build_manifest(url, events, phases)
+    if cache is not None:
+        cache.put(url, manifest)
+    return manifest
+
+
+def primary_event(manifest, event_id=None):
+    """
+    The event with id event_id when given (None if the manifest lacks it), else the
+    first event with both a tableau and pools, else the first with any phase (or None).
+    """
+    if event_id is not None:
+        return next((event for event in manifest["events"] if event["id"].upper() == event_id.upper()), None)
+    for event in manifest["events"]:
+        if event["tableaus"] and event["pools"]:
+            return event
+    return next((event for event in manifest["events"] if event["tableaus"] or event["pools"]), None)
+
+
+def _scrape_phase(kind, url, capture, profiler=None):
+    from scraper import extract_tableau_results, extract_poules_results  # scraper imports this module
+    if kind == "tableaus":
+        df_matches, df_fencers = extract_tableau_results(url, profiler)
+        return {"matches": df_matches, "fencers": df_fencers}
+    df_poules, df_poules_summary, df_pool_checks = extract_poules_results(url, capture, profiler)
+    return {"poules": df_poules, "summary": df_poules_summary, "pool_checks": df_pool_checks}
+
+
+def scrape_manifest(manifest, capture=DEFAULT_CAPTURE, workers=2, profiler=None):
+    """
+    Scrapes every pool round and tableau of the manifest, at most `workers` at a time.
+    Returns one dict per phase, in manifest order: event, kind, id, name, url and either
+    "frames" (dict of DataFrames) or "error" (the message of a failed phase; the other
+    phases still run). With an enabled profiling.StageProfiler the phases run one after
+    another in the calling thread instead, since the profilers only see the thread
+    that started them; each phase's stages are named "<kind>_<id>.<stage>".
+    """
+    phases = [dict(phase, event=event["id"], kind=kind)
+              for event in manifest["events"] for kind in ("tableaus", "pools") for phase in event[kind]]
+
+    def run(phase, profiler=None):
+        try:
+            return dict(phase, frames=_scrape_phase(phase["kind"], phase["url"], capture, profiler))
+        except Exception as e:
+            return dict(phase, error=str(e))
+
+    if profiler is not None and profiler.enabled:
+        results = []
+        for phase in phases:
+            with profiler.scope(f"{phase['kind']}_{phase['id']}."):
+                results.append(run(phase, profiler))
+        return results
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run, phases))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Discover and scrape every phase of a tournament or event.")
+    parser.add_argument("url", help="tournament or event page")
+    parser.add_argument("--scrape", action="store_true", help="scrape every discovered phase")
+    parser.add_argument("--out", default="phases", help="output directory for --scrape")
+    parser.add_argument("--workers", type=int, default=2, help="concurrent browsers")
+    parser.add_argument("--capture", default=DEFAULT_CAPTURE, help="pool URL capture backend")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--ttl", type=float, default=600.0, help="seconds a manifest is reused")
+    args = parser.parse_args()
+    manifest = discover(args.url, ManifestCache(args.cache_dir, args.ttl), args.workers)
+    if not args.scrape:
+        print(json.dumps(manifest, indent=2))
+        return
+    for result in scrape_manifest(manifest, args.capture, args.workers):
+        label = f"{result['event']}/{result['kind']}-{result['id']}"
+        if "error" in result:
+            print(f"{label}: failed: {result['error']}")
+            continue
+        os.makedirs(os.path.join(args.out, result["event"]), exist_ok=True)
+        for frame, df in result["frames"].items():
+            df.to_csv(os.path.join(args.out, f"{label}-{frame}.csv"), index=False)
+        print(f"{label}: {', '.join(f'{frame} {len(df)} rows' for frame, df in result['frames'].items())}")
+
+
+if __name__ == "__main__":
+    main()
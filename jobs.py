@@ -0,0 +1,196 @@
+"""
+Process-wide scrape job queue shared by all Streamlit sessions.
+
+Sessions submit an event URL and get a Job back; a fixed pool of worker
+threads runs the pipeline, so at most `workers` scrapes (and their browsers)
+run at once however many sessions are open. Submitting an event that is
+already queued or running returns the existing job, and a finished job is
+reused for `result_ttl` seconds. Results of complete events are also written
+to disk (one pickle per event under cache_dir), so once their job expires from
+memory a new submission is answered from disk instead of scraping again.
+With a snapshot.SnapshotStore, every successful scrape also appends its changed
+rows to the event's snapshot.
+Sessions keep the job id and poll it with get().
+
+Threads are enough here: the heavy lifting happens in the browser process
+and in network waits, not in Python.
+"""
+import hashlib
+import itertools
+import os
+import queue
+import threading
+import time
+import pandas as pd
+from capture import DEFAULT_CAPTURE
+from scraper import scrape_event
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+DEFAULT_CACHE_DIR = os.path.join(".ftl_cache", "complete")
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, job_id, key, base_url, capture):
+        self.id = job_id
+        self.key = key
+        self.base_url = base_url
+        self.capture = capture
+        self.status = QUEUED
+        self.stage = "Waiting for a worker..."
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None   # dict of DataFrames from scrape_event
+        self.error = None
+
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+
+def event_key(base_url, capture):
+    """Deduplication key: the same event page scraped with the same backend."""
+    return base_url.strip().rstrip("/").lower(), capture
+
+
+class JobQueue:
+    def __init__(self, workers=2, max_queued=20, result_ttl=300, run=scrape_event, cache_dir=DEFAULT_CACHE_DIR,
+                 snapshots=None):
+        self.run = run
+        self.cache_dir = cache_dir
+        self.snapshots = snapshots
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.jobs = {}       # job id -> Job
+        self.by_key = {}     # event key -> latest Job for that event
+        self.pending = queue.Queue()
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.threads = [threading.Thread(target=self._worker, name=f"scrape-worker-{i}", daemon=True)
+                        for i in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, base_url, capture=DEFAULT_CAPTURE):
+        """
+        Returns the job for this event: the queued/running one, a recently finished
+        one, or a newly queued job. Raises QueueFull when too many jobs are waiting.
+        """
+        key = event_key(base_url, capture)
+        with self.lock:
+            self._expire()
+            job = self.by_key.get(key)
+            if job is not None and (job.active or job.status == DONE):
+                return job
+        # read outside the lock so a slow unpickle does not hold up every session's polling
+        result = self._load_complete(key)
+        with self.lock:
+            job = self.by_key.get(key)  # another session may have submitted it meanwhile
+            if job is not None and (job.active or job.status == DONE):
+                return job
+            if result is not None:
+                job = Job(next(self.ids), key, base_url.strip(), capture)
+                job.result, job.finished, job.stage, job.status = result, time.time(), "Finished", DONE
+                self.jobs[job.id] = job
+                self.by_key[key] = job
+                return job
+            if self.pending.qsize() >= self.max_queued:
+                raise QueueFull(f"{self.pending.qsize()} scrapes are already waiting; try again shortly.")
+            job = Job(next(self.ids), key, base_url.strip(), capture)
+            self.jobs[job.id] = job
+            self.by_key[key] = job
+            self.pending.put(job)
+            return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def position(self, job):
+        """1-based place of a queued job in the queue (0 once it is running or finished)."""
+        if job.status != QUEUED:
+            return 0
+        with self.lock:
+            return sum(1 for j in self.jobs.values() if j.status == QUEUED and j.id <= job.id)
+
+    def status(self):
+        """Counts of jobs by status, for display."""
+        with self.lock:
+            statuses = [job.status for job in self.jobs.values()]
+        return {status: statuses.count(status) for status in (QUEUED, RUNNING, DONE, FAILED)}
+
+    def _expire(self):
+        """Forgets finished jobs older than result_ttl (called with the lock held)."""
+        now = time.time()
+        for job_id, job in list(self.jobs.items()):
+            if not job.active and now - job.finished >= self.result_ttl:
+                del self.jobs[job_id]
+                if self.by_key.get(job.key) is job:
+                    del self.by_key[job.key]
+
+    def _complete_path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha1("|".join(key).encode("utf-8")).hexdigest() + ".pkl")
+
+    def _load_complete(self, key):
+        """
+        The stored result of a complete event, or None. A file that cannot be
+        unpickled (corrupt, or written by other pandas/module versions) is deleted so
+        the event is scraped again.
+        """
+        path = self._complete_path(key)
+        try:
+            return pd.read_pickle(path)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def _store_complete(self, job):
+        path = self._complete_path(job.key)
+        tmp = path + ".tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            pd.to_pickle(job.result, tmp)
+            os.replace(tmp, path)
+        except OSError:
+            pass  # the job still has its result; only the permanent copy is missing
+
+    def _snapshot(self, job):
+        try:
+            self.snapshots.write(job.result["event"], job.result)
+        except OSError:
+            pass  # the snapshot catches up with the next scrape of the event
+
+    def _worker(self):
+        while True:
+            job = self.pending.get()
+            job.status = RUNNING
+            job.started = time.time()
+
+            def progress(stage):
+                job.stage = stage
+
+            # status is set last so a finished job always has its result and finish time
+            try:
+                job.result = self.run(job.base_url, job.capture, progress)
+                if self.snapshots is not None:
+                    self._snapshot(job)
+                if job.result.get("complete"):
+                    self._store_complete(job)
+                job.finished, job.stage, job.status = time.time(), "Finished", DONE
+            except Exception as e:
+                job.error = str(e)
+                job.finished, job.stage, job.status = time.time(), "Failed", FAILED
+            finally:
+                self.pending.task_done()
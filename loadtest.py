@@ -0,0 +1,186 @@
+"""
+Load driver for the scrape pipeline against mock_server.py.
+
+Serves a fixtures directory with the mock server, runs one target `--runs`
+times with `--concurrency` threads and reports client-side throughput
+(scrapes/s) and the p50/p95/p99 latency of whole scrapes, next to the mock's
+own request statistics (/__stats), so changes to the pipeline can be compared
+under the same simulated network. Only clean scrapes count towards throughput
+and latency: scrapes that raised are reported as failed, and scrapes that
+returned partial data (pools answered with 429/503, a failed phase, an
+incomplete fixture event) as degraded.
+
+Targets (each run covers every matching page recorded in the fixtures):
+  event    scraper.scrape_event on each events/view/<id> page     (needs a browser)
+  tableau  scraper.extract_tableau_results on each tableau         (needs a browser)
+  pools    scraper.extract_poules_results on each pools page       (needs a browser)
+  sheets   scraper.pool_sheet_results on each pools page's sheets  (requests only)
+
+Usage:
+  python loadtest.py --fixtures fixtures --target sheets --runs 200 --concurrency 8
+  python loadtest.py --target event --runs 10 --concurrency 2 --latency 120 --jitter 40 --json run.json
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from capture import DEFAULT_CAPTURE
+from completion import tableau_complete
+from mock_server import MockConfig, percentile, start_in_thread
+
+TARGETS = ("event", "tableau", "pools", "sheets")
+
+
+def fixture_pages(fixtures):
+    """URL paths of the recorded event pages, tableaus and pools pages, plus the pool numbers of each pools page."""
+    pages = {"event": [], "tableau": [], "pools": [], "sheets": {}}
+    for root, dirs, files in os.walk(fixtures):
+        rel_root = os.path.relpath(root, fixtures).replace(os.sep, "/")
+        prefix = "/" if rel_root == "." else "/" + rel_root + "/"
+        for d in sorted(dirs):
+            if d.endswith(".windows"):
+                pages["tableau"].append(prefix + d[:-len(".windows")])
+            elif d.endswith(".pools"):
+                path = prefix + d[:-len(".pools")]
+                pages["pools"].append(path)
+                pools = [f[:-len(".html")] for f in os.listdir(os.path.join(root, d)) if f.endswith(".html")]
+                pages["sheets"][path] = sorted(pools, key=lambda p: (len(p), p))
+        dirs[:] = [d for d in dirs if not d.endswith((".windows", ".pools"))]
+        if rel_root.startswith("events/view"):
+            pages["event"] += [prefix + f[:-len(".html")] for f in sorted(files) if f.endswith(".html")]
+    return pages
+
+
+def scrape_jobs(target, base_url, pages, capture):
+    """One callable per recorded page of the target; a run calls each of them once."""
+    import scraper
+
+    if target == "event":
+        return [lambda path=path: scraper.scrape_event(base_url + path, capture) for path in pages["event"]]
+    if target == "tableau":
+        return [lambda path=path: scraper.extract_tableau_results(base_url + path) for path in pages["tableau"]]
+    if target == "pools":
+        return [lambda path=path: scraper.extract_poules_results(base_url + path, capture)
+                for path in pages["pools"]]
+    return [lambda path=path, pools=pools: scraper.pool_sheet_results(
+                [f"{base_url}{path}/pool/{pool}?dbut=true" for pool in pools])
+            for path, pools in pages["sheets"].items()]
+
+
+def _pool_errors(df_pool_checks):
+    errors = df_pool_checks.loc[df_pool_checks["Error"] != "", "Error"]
+    return f"{len(errors)} pool(s) failed: {errors.iloc[0]}" if len(errors) else None
+
+
+def degraded(target, result):
+    """Why a scrape that did not raise still returned partial data, or None when it is clean."""
+    if target == "event":
+        for phase in result["phases"]:
+            if "error" in phase:
+                return f"{phase['kind']} {phase['id']} failed: {phase['error']}"
+            if phase["kind"] == "pools" and _pool_errors(phase["frames"]["pool_checks"]):
+                return _pool_errors(phase["frames"]["pool_checks"])
+        return None if result["complete"] else "event incomplete"
+    if target == "tableau":
+        return None if tableau_complete(result[0]) else "tableau incomplete"
+    return _pool_errors(result[2])
+
+
+def run_load(target, jobs, runs, concurrency):
+    """
+    Runs every job `runs` times over `concurrency` threads. Returns (wall seconds,
+    latencies of clean scrapes, errors, degradations) with one message per failed
+    or degraded scrape.
+    """
+    latencies = []
+    errors = []
+    degradations = []
+
+    def run(job):
+        started = time.perf_counter()
+        try:
+            result = job()
+        except Exception as e:
+            errors.append(str(e))
+            return
+        elapsed = time.perf_counter() - started
+        reason = degraded(target, result)
+        if reason is not None:
+            degradations.append(reason)
+            return
+        latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(run, [job for _ in range(runs) for job in jobs]))
+    return time.perf_counter() - started, latencies, errors, degradations
+
+
+def report(target, runs, concurrency, wall, latencies, errors, degradations, server_stats):
+    return {
+        "target": target,
+        "runs": runs,
+        "concurrency": concurrency,
+        "scrapes": len(latencies) + len(errors) + len(degradations),
+        "clean": len(latencies),
+        "degraded": len(degradations),
+        "errors": len(errors),
+        "wall_seconds": round(wall, 3),
+        "scrapes_per_second": round(len(latencies) / wall, 2) if wall else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "max": round(max(latencies) * 1000, 2) if latencies else 0.0,
+        },
+        "first_errors": sorted(set(errors))[:5],
+        "first_degradations": sorted(set(degradations))[:5],
+        "server": server_stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent scrape load against mock_server.py fixtures.")
+    parser.add_argument("--fixtures", default="fixtures", help="directory of recorded pages")
+    parser.add_argument("--target", choices=TARGETS, default="event")
+    parser.add_argument("--runs", type=int, default=10, help="times every recorded page is scraped")
+    parser.add_argument("--concurrency", type=int, default=2, help="concurrent scrapes")
+    parser.add_argument("--capture", default=DEFAULT_CAPTURE, help="pool URL capture backend")
+    parser.add_argument("--latency", type=float, default=0.0, help="added mock latency in ms")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- mock latency jitter in ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 503 responses")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="requests/second before 429 (0 = off)")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for jitter/errors")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    pages = fixture_pages(os.path.abspath(args.fixtures))
+    if not pages[args.target]:
+        parser.error(f"no {args.target} pages recorded in {args.fixtures}")
+    config = MockConfig(args.fixtures, args.latency / 1000.0, args.jitter / 1000.0,
+                        args.error_rate, args.rate_limit, args.seed)
+    server, base_url = start_in_thread(config)
+    try:
+        jobs = scrape_jobs(args.target, base_url, pages, args.capture)
+        wall, latencies, errors, degradations = run_load(args.target, jobs, args.runs, args.concurrency)
+        result = report(args.target, args.runs, args.concurrency, wall, latencies, errors, degradations,
+                        server.stats.snapshot())
+    finally:
+        server.shutdown()
+    print(f"{result['scrapes']} {args.target} scrapes in {result['wall_seconds']}s: {result['clean']} clean, "
+          f"{result['degraded']} degraded, {result['errors']} failed")
+    print(f"{result['scrapes_per_second']} clean scrapes/s")
+    print("clean scrape latency ms: " + ", ".join(f"{key} {value}" for key, value in result["latency_ms"].items()))
+    print("mock server: " + json.dumps(result["server"]))
+    for error in result["first_errors"]:
+        print(f"error: {error}")
+    for reason in result["first_degradations"]:
+        print(f"degraded: {reason}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
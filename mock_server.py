@@ -0,0 +1,272 @@
+"""
+Local stand-in for fencingtimelive.com serving recorded pages from a fixtures
+directory, with configurable latency, jitter, error rate and 429 throttling.
+
+Fixture layout (paths mirror the site's URL paths):
+  index.html                                  base page (generated from the fixtures if missing)
+  <path>.html                                 any static page, e.g. a recorded event page
+  pools/scores/<event>/<round>.pools/<N>.html pool sheets; the pools page at
+                                              /pools/scores/<event>/<round> requests each one as
+                                              .../pool/<N>?dbut=true, like the real site
+  tableaus/scores/<event>/<id>.windows/*.html tableau windows (each holding a
+                                              table.elimTableau), shown in file-name order and
+                                              switched with #prevBut/#nextBut
+
+fixtures/ holds a small event in this layout (one pool round of two pools and
+an 8-fencer tableau in two windows); record_fixtures.py records a live event.
+
+Usage:
+  python mock_server.py fixtures/ --port 8765 --latency 120 --jitter 40 --error-rate 0.01 --rate-limit 20
+
+then point app.py's base URL (or FTL_BASE_URL for the scripts) at http://127.0.0.1:8765.
+Request counts, status codes and served-latency percentiles are available at /__stats;
+loadtest.py drives concurrent scrapes against it and reports client-side throughput.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+POOL_SHEET_PATH = re.compile(r'^(?P<pools>.+)/pool/(?P<pool>[^/]+)$')
+
+TABLEAU_PAGE = """<html><head><title>Tableau</title></head><body>
+<button id="prevBut">Prev</button><button id="nextBut">Next</button>
+<div id="tableau"></div>
+<script>
+var windows = {windows};
+var current = 0;
+function show(i) {{
+  if (i < 0 || i >= windows) {{ return; }}
+  current = i;
+  fetch(window.location.pathname + "?window=" + i)
+    .then(function (r) {{ return r.text(); }})
+    .then(function (t) {{ document.getElementById("tableau").innerHTML = t; }});
+}}
+document.getElementById("prevBut").onclick = function () {{ show(current - 1); }};
+document.getElementById("nextBut").onclick = function () {{ show(current + 1); }};
+show(0);
+</script></body></html>"""
+
+POOLS_PAGE = """<html><head><title>Pools</title></head><body>
+<div id="pools"></div>
+<script>
+var pools = {pools};
+pools.forEach(function (p) {{
+  var div = document.createElement("div");
+  document.getElementById("pools").appendChild(div);
+  fetch(window.location.pathname + "/pool/" + p + "?dbut=true")
+    .then(function (r) {{ return r.text(); }})
+    .then(function (t) {{ div.innerHTML = t; }});
+}});
+</script></body></html>"""
+
+
+def percentile(samples, q):
+    """Nearest-rank percentile of a list of numbers (q in 0..100); 0.0 when empty."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class MockConfig:
+    def __init__(self, fixtures, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit=0.0, seed=None):
+        self.fixtures = os.path.abspath(fixtures)
+        self.latency = latency          # seconds added to every response
+        self.jitter = jitter            # +/- uniform seconds around latency
+        self.error_rate = error_rate    # fraction of requests answered with 503
+        self.rate_limit = rate_limit    # requests/second before answering 429 (0 = unlimited)
+        self.random = random.Random(seed)
+
+
+class MockStats:
+    """Thread-safe request counters and a bounded window of served latencies."""
+
+    def __init__(self, max_samples=100000):
+        self.lock = threading.Lock()
+        self.status = Counter()
+        self.kinds = Counter()
+        self.latencies = deque(maxlen=max_samples)
+
+    def record(self, kind, status, seconds):
+        with self.lock:
+            self.status[status] += 1
+            self.kinds[kind] += 1
+            self.latencies.append(seconds)
+
+    def snapshot(self):
+        with self.lock:
+            samples = list(self.latencies)
+            return {
+                "requests": sum(self.status.values()),
+                "status": {str(k): v for k, v in self.status.items()},
+                "kinds": dict(self.kinds),
+                "latency_ms": {
+                    "p50": round(percentile(samples, 50) * 1000, 2),
+                    "p95": round(percentile(samples, 95) * 1000, 2),
+                    "p99": round(percentile(samples, 99) * 1000, 2),
+                    "max": round(max(samples) * 1000, 2) if samples else 0.0,
+                },
+            }
+
+
+class TokenBucket:
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        if self.rate <= 0:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    server_version = "MockFencingTimeLive/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        started = time.perf_counter()
+        kind, status = self.handle_request()
+        self.server.stats.record(kind, status, time.perf_counter() - started)
+
+    def handle_request(self):
+        config = self.server.config
+        parts = urlsplit(self.path)
+        if parts.path == "/__stats":
+            return "stats", self.send_body(200, json.dumps(self.server.stats.snapshot()), "application/json")
+        if not self.server.bucket.take():
+            return "throttled", self.send_body(429, "Too Many Requests", "text/plain", {"Retry-After": "1"})
+        delay = config.latency + config.random.uniform(-config.jitter, config.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if config.random.random() < config.error_rate:
+            return "error", self.send_body(503, "Service Unavailable", "text/plain")
+        kind, body = self.route(parts.path.strip("/"), parse_qs(parts.query))
+        if body is None:
+            return kind, self.send_body(404, "Not Found", "text/plain")
+        return kind, self.send_body(200, body, "text/html; charset=utf-8")
+
+    def route(self, rel, query):
+        fixtures = self.server.config.fixtures
+        base = os.path.normpath(os.path.join(fixtures, rel or "index"))
+        if not base.startswith(fixtures + os.sep):
+            return "invalid", None
+        if os.path.isdir(base + ".windows"):
+            windows = sorted(f for f in os.listdir(base + ".windows") if f.endswith(".html"))
+            if "window" in query:
+                try:
+                    name = windows[int(query["window"][0])]
+                except (ValueError, IndexError):
+                    return "tableau_window", None
+                return "tableau_window", read_text(os.path.join(base + ".windows", name))
+            return "tableau", TABLEAU_PAGE.format(windows=len(windows))
+        if os.path.isdir(base + ".pools"):
+            pools = sorted((f[:-len(".html")] for f in os.listdir(base + ".pools") if f.endswith(".html")),
+                           key=lambda p: (len(p), p))
+            return "pools", POOLS_PAGE.format(pools=json.dumps(pools))
+        m = POOL_SHEET_PATH.match(base)
+        if m and os.path.isdir(m.group("pools") + ".pools"):
+            path = os.path.join(m.group("pools") + ".pools", m.group("pool") + ".html")
+            return "pool_sheet", read_text(path) if os.path.isfile(path) else None
+        if os.path.isfile(base + ".html"):
+            return "page", read_text(base + ".html")
+        if not rel:
+            return "index", generated_index(fixtures)
+        return "missing", None
+
+    def send_body(self, status, body, content_type, headers=None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+        return status
+
+
+def read_text(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def generated_index(fixtures):
+    """Base page linking every recorded tableau, pools page and static page."""
+    links = []
+    for root, dirs, files in os.walk(fixtures):
+        rel_root = os.path.relpath(root, fixtures).replace(os.sep, "/")
+        prefix = "" if rel_root == "." else rel_root + "/"
+        for d in sorted(dirs):
+            for suffix in (".windows", ".pools"):
+                if d.endswith(suffix):
+                    links.append("/" + prefix + d[:-len(suffix)])
+        dirs[:] = [d for d in dirs if not d.endswith((".windows", ".pools"))]
+        for f in sorted(files):
+            if f.endswith(".html") and f != "index.html":
+                links.append("/" + prefix + f[:-len(".html")])
+    items = "\n".join(f'<li><a href="{link}">{link}</a></li>' for link in links)
+    return f"<html><body><ul>\n{items}\n</ul></body></html>"
+
+
+def make_server(config, host="127.0.0.1", port=0):
+    """Creates (but does not start) the mock server; port 0 picks a free port."""
+    server = ThreadingHTTPServer((host, port), MockHandler)
+    server.daemon_threads = True
+    server.config = config
+    server.stats = MockStats()
+    server.bucket = TokenBucket(config.rate_limit)
+    return server
+
+
+def start_in_thread(config, host="127.0.0.1", port=0):
+    """Starts the mock server in a daemon thread and returns (server, base_url)."""
+    server = make_server(config, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{server.server_address[0]}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded FencingTimeLive pages locally.")
+    parser.add_argument("fixtures", help="directory of recorded pages")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="added latency in ms")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- latency jitter in ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 503 responses")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="requests/second before 429 (0 = off)")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for jitter/errors")
+    args = parser.parse_args()
+    config = MockConfig(args.fixtures, args.latency / 1000.0, args.jitter / 1000.0,
+                        args.error_rate, args.rate_limit, args.seed)
+    server = make_server(config, args.host, args.port)
+    print(f"Serving {config.fixtures} on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
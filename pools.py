@@ -0,0 +1,234 @@
+"""
+Header-driven parsing of FencingTimeLive pool sheets (the "dbut=true" pages).
+
+Columns are located from the pool table's header row instead of fixed cell
+positions: numbered headers ("1".."n") are bout columns, and the site's own
+summary columns (V, V/M, TS, TR, Ind, Pl) are read when present. Pools of any
+size are supported; if the header cannot be mapped the bout columns fall back
+to the cells after the name and position cells, one per fencer.
+
+The site's totals are used to cross-check the totals computed from the bouts.
+When they agree the pool summary can be taken from them directly; pools where
+they disagree are reported by check().
+"""
+from bs4 import BeautifulSoup
+import pandas as pd
+
+# normalized header text -> totals key
+TOTAL_HEADERS = {"V": "V", "V/M": "VM", "TS": "TS", "TR": "TR", "IND": "Ind", "PL": "Pl"}
+CHECKED_TOTALS = ("V", "TS", "TR", "Ind")
+CHECK_COLUMNS = ["PoolNumber", "Fencers", "Bouts", "Complete", "HasTotals", "Consistent", "Mismatches", "Error"]
+
+
+def _header_cells(pool_table):
+    """Header texts of the pool table, repeated for cells spanning several columns."""
+    header_row = None
+    thead = pool_table.find("thead")
+    if thead:
+        header_row = thead.find("tr")
+    if header_row is None:
+        for row in pool_table.find_all("tr"):
+            if row.find("th", recursive=False):
+                header_row = row
+                break
+    if header_row is None:
+        return []
+    texts = []
+    for cell in header_row.find_all(["th", "td"], recursive=False):
+        try:
+            span = max(1, int(cell.get("colspan", 1)))
+        except ValueError:
+            span = 1
+        texts.extend([cell.get_text(strip=True)] * span)
+    return texts
+
+
+def map_pool_columns(headers, num_fencers):
+    """
+    Returns (bout_columns, total_columns): the cell index of bout column 1..n, and a
+    dict of totals key -> cell index for the summary columns found in the header.
+    """
+    numbered = {}
+    totals = {}
+    for index, text in enumerate(headers):
+        key = text.upper().replace(" ", "")
+        if key.isdigit() and int(key) not in numbered:
+            numbered[int(key)] = index
+        elif key in TOTAL_HEADERS and TOTAL_HEADERS[key] not in totals:
+            totals[TOTAL_HEADERS[key]] = index
+    if all(n in numbered for n in range(1, num_fencers + 1)):
+        bout_columns = [numbered[n] for n in range(1, num_fencers + 1)]
+    else:
+        bout_columns = list(range(2, 2 + num_fencers))
+    return bout_columns, totals
+
+
+def _cell_result(cell):
+    span = cell.find("span")
+    return span.get_text(strip=True) if span else cell.get_text(strip=True)
+
+
+def _parse_total(key, text):
+    text = text.strip()
+    if not text:
+        return None
+    try:
+        return float(text) if key == "VM" else int(text.lstrip("+"))
+    except ValueError:
+        return None
+
+
+class PoolSheet:
+    def __init__(self, pool_number, fencers, nationalities, results_matrix, totals):
+        self.pool_number = pool_number
+        self.fencers = fencers
+        self.nationalities = nationalities
+        self.results_matrix = results_matrix
+        self.totals = totals  # one dict per fencer (possibly empty) of the site's V/VM/TS/TR/Ind/Pl
+
+    def bouts(self):
+        """The pool's completed bouts as dicts in the bout table layout."""
+        bouts = []
+        num_fencers = len(self.fencers)
+        for i in range(num_fencers):
+            for j in range(i + 1, num_fencers):
+                try:
+                    result_i_j = self.results_matrix[i][j]
+                    result_j_i = self.results_matrix[j][i]
+                except IndexError:
+                    continue
+                if not result_i_j or not result_j_i:
+                    continue
+                if result_i_j[0] not in "VD":
+                    continue
+                try:
+                    score_i = int(result_i_j[1:])
+                    score_j = int(result_j_i[1:])
+                except ValueError:
+                    continue
+                bouts.append({
+                    "PoolNumber": self.pool_number,
+                    "Fencer1_Name": self.fencers[i],
+                    "Fencer1_Nationality": self.nationalities[i],
+                    "Fencer1_Score": score_i,
+                    "Fencer2_Name": self.fencers[j],
+                    "Fencer2_Nationality": self.nationalities[j],
+                    "Fencer2_Score": score_j,
+                    "Winner": self.fencers[i] if result_i_j.startswith("V") else self.fencers[j],
+                })
+        return bouts
+
+    def computed_totals(self, bouts=None):
+        """Per-fencer V, M (bouts fenced), TS, TR and Ind computed from the bouts."""
+        totals = [{"V": 0, "M": 0, "TS": 0, "TR": 0} for _ in self.fencers]
+        index = {name: i for i, name in enumerate(self.fencers)}
+        for bout in self.bouts() if bouts is None else bouts:
+            i, j = index[bout["Fencer1_Name"]], index[bout["Fencer2_Name"]]
+            s_i, s_j = bout["Fencer1_Score"], bout["Fencer2_Score"]
+            winner = i if bout["Winner"] == bout["Fencer1_Name"] else j
+            totals[winner]["V"] += 1
+            for a, b, ts, tr in ((i, j, s_i, s_j), (j, i, s_j, s_i)):
+                totals[a]["M"] += 1
+                totals[a]["TS"] += ts
+                totals[a]["TR"] += tr
+        for t in totals:
+            t["Ind"] = t["TS"] - t["TR"]
+        return totals
+
+    @property
+    def complete(self):
+        """True when every bout has been fenced: no empty cell off the diagonal of the results matrix."""
+        n = len(self.fencers)
+        return all(j < len(row) and row[j] for i, row in enumerate(self.results_matrix) for j in range(n) if i != j)
+
+    @property
+    def has_totals(self):
+        return bool(self.totals) and all(
+            all(t.get(key) is not None for key in ("V", "TS", "TR")) for t in self.totals
+        )
+
+    def check(self, bouts=None):
+        """List of mismatches ("NAME: TS 20 != 21") between the site's totals and ours."""
+        mismatches = []
+        for name, site, ours in zip(self.fencers, self.totals, self.computed_totals(bouts)):
+            for key in CHECKED_TOTALS:
+                if site.get(key) is not None and site[key] != ours[key]:
+                    mismatches.append(f"{name}: {key} {site[key]} != {ours[key]}")
+        return mismatches
+
+    def summary_rows(self, bouts=None):
+        """
+        Summary rows (Fencer, Nationality, Victories, Defeats, TS, TR, Difference) taken
+        from the site's totals; only meaningful when has_totals and check() is empty.
+        """
+        rows = []
+        for name, nationality, site, ours in zip(self.fencers, self.nationalities, self.totals,
+                                                 self.computed_totals(bouts)):
+            rows.append({"Fencer": name, "Nationality": nationality,
+                         "Victories": site["V"], "Defeats": ours["M"] - site["V"],
+                         "TS": site["TS"], "TR": site["TR"], "Difference": site["TS"] - site["TR"]})
+        return rows
+
+
+def parse_pool_sheet(html, default_pool_number):
+    """
+    Parses one pool sheet. Returns a PoolSheet, or None when the page has no pool
+    table or no fencer rows.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    pool_header_tag = soup.find("h4", class_="poolNum")
+    pool_number = pool_header_tag.get_text(strip=True) if pool_header_tag else default_pool_number
+    pool_table = soup.find("table", class_="poolTable")
+    if not pool_table:
+        return None
+    body = pool_table.find("tbody") or pool_table
+    rows = body.find_all("tr", class_="poolRow")
+    if not rows:
+        return None
+    bout_columns, total_columns = map_pool_columns(_header_cells(pool_table), len(rows))
+    fencers = []
+    nationalities = []
+    results_matrix = []
+    totals = []
+    for row in rows:
+        cells = row.find_all("td")
+        name_tag = cells[0].find("span", class_="poolCompName") if cells else None
+        fencers.append(name_tag.get_text(strip=True) if name_tag else "Unknown")
+        affil_tag = cells[0].find("span", class_="poolAffil") if cells else None
+        nationalities.append(affil_tag.get_text(strip=True) if affil_tag else "Unknown")
+        results_matrix.append([_cell_result(cells[i]) if i < len(cells) else "" for i in bout_columns])
+        totals.append({key: _parse_total(key, cells[i].get_text(strip=True))
+                       for key, i in total_columns.items() if i < len(cells)})
+    return PoolSheet(pool_number, fencers, nationalities, results_matrix, totals)
+
+
+def pool_results(sheets, failed=()):
+    """
+    Combines parsed pool sheets into (df_poules, df_summary_rows, df_checks).
+    df_summary_rows is built from the site's totals when every pool has them and
+    they agree with the bouts, and is None otherwise (the caller then computes it
+    from df_poules). df_checks has one row per pool (CHECK_COLUMNS), including one
+    incomplete row per (pool_number, error) in failed, for pools that could not be
+    fetched or parsed, so a missing pool is never mistaken for a finished one.
+    """
+    all_bouts = []
+    summary_rows = []
+    checks = []
+    use_site_totals = bool(sheets)
+    for sheet in sheets:
+        bouts = sheet.bouts()
+        all_bouts.extend(bouts)
+        mismatches = sheet.check(bouts) if sheet.has_totals else []
+        consistent = sheet.has_totals and not mismatches
+        if consistent and use_site_totals:
+            summary_rows.extend(sheet.summary_rows(bouts))
+        else:
+            use_site_totals = False
+        checks.append({"PoolNumber": sheet.pool_number, "Fencers": len(sheet.fencers), "Bouts": len(bouts),
+                       "Complete": sheet.complete, "HasTotals": sheet.has_totals, "Consistent": consistent,
+                       "Mismatches": "; ".join(mismatches), "Error": ""})
+    for pool_number, error in failed:
+        checks.append({"PoolNumber": pool_number, "Fencers": 0, "Bouts": 0, "Complete": False,
+                       "HasTotals": False, "Consistent": False, "Mismatches": "", "Error": error})
+    df_summary = pd.DataFrame(summary_rows) if use_site_totals else None
+    return pd.DataFrame(all_bouts), df_summary, pd.DataFrame(checks, columns=CHECK_COLUMNS)
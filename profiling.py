@@ -0,0 +1,259 @@
+"""
+Per-stage profiling of a scrape: cProfile for exact per-function times plus a
+stack sampler for flame graphs.
+
+Each stage (tableau navigation, bracket assembly, match building, pool URL
+capture, pool sheet parsing, ...) is profiled separately. Both measure CPU
+time, not wall time: the pipeline spends most of its wall time sleeping
+between clicks and waiting on the browser, so cProfile uses the process CPU
+clock and the sampler drops samples taken while the thread was idle (its CPU
+clock did not advance, or it was sleeping or waiting on a socket). StageProfiler.write() produces, in its output directory:
+  <stage>.prof       cProfile stats (pstats / snakeviz)
+  <stage>.collapsed  sampled stacks in collapsed format ("a;b;c 12"), ready for
+                     flamegraph.pl or speedscope
+  all.collapsed      every stage under a root frame named after the stage
+  report.json        wall time, CPU sample and idle sample counts and the top-N
+                     functions by own CPU time for each stage, for comparing
+                     runs across versions
+
+Entry points:
+  python profiling.py URL [--out DIR]           the app.py pipeline on a live event page
+  python profiling.py --fixtures DIR [PATH]     the same against mock_server.py fixtures
+  python tableau.py --profile                   the scripts (FTL_PROFILE_DIR sets the output)
+  python fencingtimelive_poules.py --profile
+  streamlit run app.py -- --profile             every job run by the app's workers
+
+cProfile allows one active profiler per process on recent Pythons, so the app
+runs a single worker while profiling.
+"""
+import argparse
+import cProfile
+import json
+import os
+import platform
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+DEFAULT_TOP = 30
+DEFAULT_INTERVAL = 0.005
+# Leaf frames of a thread blocked in Python-level waits, for platforms without per-thread CPU clocks
+IDLE_FUNCTIONS = {("socket.py", "readinto"), ("selectors.py", "select"), ("threading.py", "wait"),
+                  ("ssl.py", "read"), ("ssl.py", "recv_into"), ("connection.py", "create_connection")}
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _thread_cpu_clock(thread_id):
+    """Reads the CPU time of a thread (by threading ident), or None where that is unsupported."""
+    try:
+        clock = time.pthread_getcpuclockid(thread_id)
+        time.clock_gettime(clock)
+    except (AttributeError, OSError):
+        return None
+    return lambda: time.clock_gettime(clock)
+
+
+class StackSampler(threading.Thread):
+    """
+    Samples the stack of one thread every `interval` seconds into collapsed-stack
+    counts, skipping samples where the thread was idle (counted in `idle`).
+    """
+
+    def __init__(self, thread_id, interval=DEFAULT_INTERVAL):
+        super().__init__(name="stack-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self.idle = 0
+        self.stopped = threading.Event()
+        self.cpu_clock = _thread_cpu_clock(thread_id)
+
+    def _idle(self, frame, cpu_used):
+        if cpu_used is not None:
+            # time.sleep and blocking socket calls are C functions, invisible in the
+            # Python stack; a thread in them uses (almost) no CPU between samples.
+            return cpu_used < self.interval / 10
+        code = frame.f_code
+        return (os.path.basename(code.co_filename), code.co_name) in IDLE_FUNCTIONS
+
+    def run(self):
+        last_cpu = self.cpu_clock() if self.cpu_clock else None
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            cpu_used = None
+            if self.cpu_clock:
+                cpu = self.cpu_clock()
+                cpu_used, last_cpu = cpu - last_cpu, cpu
+            if frame is not None and self._idle(frame, cpu_used):
+                self.idle += 1
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class StageProfiler:
+    """
+    Profiles consecutive stages of the calling thread. start(name) ends the
+    current stage and begins the next, so straight-line scripts only need one
+    call per stage; stage(name) is the context-manager form. A disabled
+    profiler does nothing, which keeps call sites unconditional.
+    """
+
+    def __init__(self, out_dir, enabled=True, top=DEFAULT_TOP, interval=DEFAULT_INTERVAL, label=None):
+        self.out_dir = out_dir
+        self.enabled = enabled
+        self.top = top
+        self.interval = interval
+        self.label = label
+        self.prefix = ""
+        self.stages = []          # (name, wall seconds, pstats.Stats, StackSampler)
+        self._current = None
+
+    def start(self, name):
+        if not self.enabled:
+            return
+        self.stop()
+        name = self.prefix + name
+        profile = cProfile.Profile(time.process_time)
+        sampler = StackSampler(threading.get_ident(), self.interval)
+        sampler.start()
+        self._current = (name, time.perf_counter(), profile, sampler)
+        profile.enable()
+
+    def stop(self):
+        if self._current is None:
+            return
+        name, started, profile, sampler = self._current
+        profile.disable()
+        wall = time.perf_counter() - started
+        sampler.stop()
+        self.stages.append((name, wall, pstats.Stats(profile), sampler))
+        self._current = None
+
+    def scope(self, prefix):
+        """Context manager prefixing the names of the stages started inside it, e.g. one per phase."""
+        profiler = self
+
+        class _Scope:
+            def __enter__(self):
+                profiler.prefix = prefix
+
+            def __exit__(self, *exc):
+                profiler.stop()
+                profiler.prefix = ""
+
+        return _Scope()
+
+    def stage(self, name):
+        profiler = self
+
+        class _Stage:
+            def __enter__(self):
+                profiler.start(name)
+
+            def __exit__(self, *exc):
+                profiler.stop()
+
+        return _Stage()
+
+    def hot_functions(self, stats):
+        """Top functions by own CPU time: function, file, line, calls, tottime, cumtime."""
+        rows = []
+        for (filename, line, function), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+            rows.append({"function": function, "file": filename, "line": line, "calls": ncalls,
+                         "tottime": round(tottime, 6), "cumtime": round(cumtime, 6)})
+        rows.sort(key=lambda row: row["tottime"], reverse=True)
+        return rows[:self.top]
+
+    def write(self):
+        """Ends the current stage and writes the profiles; returns the report path (None if disabled)."""
+        if not self.enabled:
+            return None
+        self.stop()
+        os.makedirs(self.out_dir, exist_ok=True)
+        report = {"label": self.label, "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                  "python": platform.python_version(), "interval": self.interval, "stages": []}
+        combined = []
+        for name, wall, stats, sampler in self.stages:
+            counts = sampler.counts
+            stats.dump_stats(os.path.join(self.out_dir, f"{name}.prof"))
+            lines = [f"{stack} {count}" for stack, count in counts.most_common()]
+            with open(os.path.join(self.out_dir, f"{name}.collapsed"), "w", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n" if lines else "")
+            combined += [f"{name};{line}" for line in lines]
+            report["stages"].append({"stage": name, "wall_seconds": round(wall, 4),
+                                     "cpu_seconds": round(stats.total_tt, 4), "samples": sum(counts.values()),
+                                     "idle_samples": sampler.idle, "top": self.hot_functions(stats)})
+        with open(os.path.join(self.out_dir, "all.collapsed"), "w", encoding="utf-8") as f:
+            f.write("\n".join(combined) + "\n" if combined else "")
+        path = os.path.join(self.out_dir, "report.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        return path
+
+
+def default_out_dir(name):
+    root = os.environ.get("FTL_PROFILE_DIR", "profiles")
+    return os.path.join(root, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}")
+
+
+def script_profiler(name):
+    """Profiler for a script: enabled by --profile on its command line."""
+    return StageProfiler(default_out_dir(name), enabled="--profile" in sys.argv, label=name)
+
+
+def profile_scrape_event(base_url, capture=None, progress=None, out_dir=None, top=DEFAULT_TOP, manifest_cache=None):
+    """
+    scraper.scrape_event with each pipeline stage profiled; same arguments and result,
+    with the profiles written to out_dir (a fresh directory under FTL_PROFILE_DIR by default).
+    """
+    from capture import DEFAULT_CAPTURE
+    from scraper import scrape_event
+
+    profiler = StageProfiler(out_dir or default_out_dir("scrape"), top=top, label=base_url)
+    try:
+        return scrape_event(base_url, capture or DEFAULT_CAPTURE, progress, profiler, manifest_cache)
+    finally:
+        print(f"Profile written to {profiler.write()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the scrape pipeline stage by stage.")
+    parser.add_argument("target", nargs="?", default="",
+                        help="event page URL, or a path on the mock server with --fixtures")
+    parser.add_argument("--fixtures", help="serve this fixtures directory with mock_server.py and scrape it")
+    parser.add_argument("--capture", default=None, help="pool URL capture backend")
+    parser.add_argument("--out", default=None, help="output directory")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="hot functions kept per stage")
+    args = parser.parse_args()
+    server = None
+    url = args.target
+    if args.fixtures:
+        from urllib.parse import urljoin
+        from mock_server import MockConfig, start_in_thread
+        server, base_url = start_in_thread(MockConfig(args.fixtures))
+        url = urljoin(base_url + "/", args.target.lstrip("/"))
+    elif not url:
+        parser.error("an event page URL is required without --fixtures")
+    try:
+        profile_scrape_event(url, args.capture, out_dir=args.out, top=args.top)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
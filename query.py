@@ -0,0 +1,212 @@
+"""
+Indexed query layer over stored pool bouts and tableau matches.
+
+Events are added with add_event(); every bout is stored twice, once from each
+fencer's point of view ("sides"), sorted chronologically. Three indexes are
+built over the sides on first query after a change:
+  - fencer -> row positions,
+  - (fencer, opponent) -> row positions,
+  - nation -> fencers,
+so head-to-head, form and nation lookups are a dict lookup plus an iloc
+instead of a filter over the whole store.
+"""
+import re
+import numpy as np
+import pandas as pd
+
+SIDE_COLUMNS = ["Event", "Date", "Phase", "Stage", "Fencer", "Nationality",
+                "Opponent", "OpponentNationality", "TS", "TR", "Result"]
+TABLEAU_SCORE = re.compile(r'(\d+)\s*-\s*(\d+)')
+
+
+def name_key(name):
+    """Normalized lookup key for a fencer name (upper case, single spaces)."""
+    return " ".join(str(name).upper().split())
+
+
+def name_keys(series):
+    return series.astype(str).str.upper().str.split().str.join(" ")
+
+
+def _poule_bouts(df_poules):
+    """Pool bouts as (Stage, Fencer1, Nation1, Score1, Fencer2, Nation2, Score2, Won1)."""
+    return pd.DataFrame({
+        "Phase": "pool",
+        "Stage": df_poules["PoolNumber"].astype(str).to_numpy(),
+        "Fencer1": df_poules["Fencer1_Name"].astype(str).to_numpy(),
+        "Nation1": df_poules["Fencer1_Nationality"].astype(str).to_numpy(),
+        "Score1": df_poules["Fencer1_Score"].astype(int).to_numpy(),
+        "Fencer2": df_poules["Fencer2_Name"].astype(str).to_numpy(),
+        "Nation2": df_poules["Fencer2_Nationality"].astype(str).to_numpy(),
+        "Score2": df_poules["Fencer2_Score"].astype(int).to_numpy(),
+        "Won1": (df_poules["Winner"].astype(str).to_numpy()
+                 == df_poules["Fencer1_Name"].astype(str).to_numpy()),
+    })
+
+
+def _tableau_bouts(df_matches):
+    """
+    Tableau matches that were actually fenced (two fencers, a winner and a numeric
+    score), in the same layout as _poule_bouts. The higher score goes to the winner.
+    """
+    df = df_matches.astype({"Fencer1": str, "Fencer2": str, "Winner": str, "Score": str})
+    scores = df["Score"].str.extract(TABLEAU_SCORE).astype(float)
+    fenced = (scores.notna().all(axis=1) & (df["Winner"] != "")
+              & (df["Fencer1"] != "") & (df["Fencer2"] != ""))
+    df, scores = df[fenced], scores[fenced]
+    high = scores.max(axis=1).astype(int).to_numpy()
+    low = scores.min(axis=1).astype(int).to_numpy()
+    won1 = (df["Winner"] == df["Fencer1"]).to_numpy()
+    return pd.DataFrame({
+        "Phase": "tableau",
+        "Stage": df["Round"].astype(str).to_numpy(),
+        "Fencer1": df["Fencer1"].to_numpy(),
+        "Nation1": df["Fencer1_Nationality"].astype(str).to_numpy(),
+        "Score1": np.where(won1, high, low),
+        "Fencer2": df["Fencer2"].to_numpy(),
+        "Nation2": df["Fencer2_Nationality"].astype(str).to_numpy(),
+        "Score2": np.where(won1, low, high),
+        "Won1": won1,
+    })
+
+
+def event_bouts(df_poules=None, df_matches=None):
+    """
+    One row per fenced bout of an event (pool bouts first, then tableau matches) with
+    Phase, Stage, Fencer1, Nation1, Score1, Fencer2, Nation2, Score2 and Won1.
+    """
+    parts = []
+    if df_poules is not None and not df_poules.empty:
+        parts.append(_poule_bouts(df_poules))
+    if df_matches is not None and not df_matches.empty:
+        parts.append(_tableau_bouts(df_matches))
+    if not parts:
+        return pd.DataFrame(columns=["Phase", "Stage", "Fencer1", "Nation1", "Score1",
+                                     "Fencer2", "Nation2", "Score2", "Won1"])
+    return pd.concat(parts, ignore_index=True)
+
+
+def record(df_sides):
+    """Win/loss record of a frame of sides: dict with Bouts, V, D, TS, TR, Difference."""
+    victories = int((df_sides["Result"] == "V").sum())
+    ts, tr = int(df_sides["TS"].sum()), int(df_sides["TR"].sum())
+    return {"Bouts": len(df_sides), "V": victories, "D": len(df_sides) - victories,
+            "TS": ts, "TR": tr, "Difference": ts - tr}
+
+
+class BoutStore:
+    def __init__(self):
+        self._events = []
+        self._sides = None
+        self._fencer_index = {}
+        self._pair_index = {}
+        self._nation_index = {}
+
+    def add_event(self, event_id, df_poules=None, df_matches=None, date=None):
+        """
+        Adds an event's pool bouts (bout table) and/or tableau matches (matches table,
+        after split_fencers). date orders events across seasons; events without a date
+        keep the order they were added in.
+        """
+        bouts = event_bouts(df_poules, df_matches)
+        if bouts.empty:
+            return
+        bouts["Event"] = str(event_id)
+        bouts["Date"] = pd.Timestamp(date) if date is not None else pd.NaT
+        bouts["EventOrder"] = len(self._events)
+        bouts["BoutOrder"] = np.arange(len(bouts))
+        self._events.append(bouts)
+        self._sides = None
+
+    def load_poules_csv(self, path, event_id, date=None):
+        """Adds the bouts of a poules_matches.csv-style file."""
+        self.add_event(event_id, df_poules=pd.read_csv(path), date=date)
+
+    def _build(self):
+        if self._sides is not None:
+            return
+        if not self._events:
+            self._sides = pd.DataFrame(columns=SIDE_COLUMNS)
+            self._fencer_index, self._pair_index, self._nation_index = {}, {}, {}
+            return
+        bouts = pd.concat(self._events, ignore_index=True)
+        bouts = bouts.sort_values(["Date", "EventOrder", "BoutOrder"], na_position="first", kind="mergesort")
+        bouts = bouts.reset_index(drop=True)
+        first = pd.DataFrame({
+            "Event": bouts["Event"], "Date": bouts["Date"], "Phase": bouts["Phase"], "Stage": bouts["Stage"],
+            "Fencer": bouts["Fencer1"], "Nationality": bouts["Nation1"],
+            "Opponent": bouts["Fencer2"], "OpponentNationality": bouts["Nation2"],
+            "TS": bouts["Score1"], "TR": bouts["Score2"], "Won": bouts["Won1"],
+        })
+        second = pd.DataFrame({
+            "Event": bouts["Event"], "Date": bouts["Date"], "Phase": bouts["Phase"], "Stage": bouts["Stage"],
+            "Fencer": bouts["Fencer2"], "Nationality": bouts["Nation2"],
+            "Opponent": bouts["Fencer1"], "OpponentNationality": bouts["Nation1"],
+            "TS": bouts["Score2"], "TR": bouts["Score1"], "Won": ~bouts["Won1"],
+        })
+        # interleave so both sides of a bout stay adjacent and chronological order holds
+        sides = pd.concat([first, second]).sort_index(kind="mergesort").reset_index(drop=True)
+        sides["Result"] = np.where(sides.pop("Won"), "V", "D")
+        for col in ("Event", "Phase", "Stage", "Fencer", "Nationality", "Opponent",
+                    "OpponentNationality", "Result"):
+            sides[col] = sides[col].astype("category")
+        sides["TS"] = sides["TS"].astype("uint8")
+        sides["TR"] = sides["TR"].astype("uint8")
+        self._sides = sides[SIDE_COLUMNS]
+
+        fencer_keys = name_keys(sides["Fencer"])
+        opponent_keys = name_keys(sides["Opponent"])
+        self._fencer_index = fencer_keys.groupby(fencer_keys, sort=False).indices
+        pair_keys = fencer_keys + "|" + opponent_keys
+        self._pair_index = pair_keys.groupby(pair_keys, sort=False).indices
+        nations = pd.DataFrame({"Nationality": sides["Nationality"].astype(str), "Fencer": sides["Fencer"].astype(str)})
+        nations = nations.drop_duplicates()
+        self._nation_index = {nation: sorted(group["Fencer"]) for nation, group in nations.groupby("Nationality")}
+
+    @property
+    def sides(self):
+        self._build()
+        return self._sides
+
+    def fencer_bouts(self, fencer):
+        """All bouts of a fencer, from their point of view, oldest first."""
+        self._build()
+        rows = self._fencer_index.get(name_key(fencer), np.array([], dtype=int))
+        return self._sides.iloc[rows].reset_index(drop=True)
+
+    def head_to_head(self, fencer, opponent):
+        """Bouts between two fencers from the first fencer's point of view, oldest first."""
+        self._build()
+        rows = self._pair_index.get(name_key(fencer) + "|" + name_key(opponent), np.array([], dtype=int))
+        return self._sides.iloc[rows].reset_index(drop=True)
+
+    def form(self, fencer, last=10):
+        """The fencer's last `last` bouts (oldest first) and their record as a dict."""
+        self._build()
+        rows = self._fencer_index.get(name_key(fencer), np.array([], dtype=int))[-last:]
+        bouts = self._sides.iloc[rows].reset_index(drop=True)
+        return bouts, record(bouts)
+
+    def nation_fencers(self, nation):
+        self._build()
+        return list(self._nation_index.get(nation, []))
+
+    def nation_report(self, nation):
+        """Per-fencer record (Bouts, V, D, TS, TR, Difference, WinRate) for a nation's fencers."""
+        self._build()
+        rows = [self._fencer_index[name_key(f)] for f in self.nation_fencers(nation)]
+        columns = ["Fencer", "Bouts", "V", "D", "TS", "TR", "Difference", "WinRate"]
+        if not rows:
+            return pd.DataFrame(columns=columns)
+        sides = self._sides.iloc[np.unique(np.concatenate(rows))]
+        sides = sides[sides["Nationality"] == nation]
+        df = pd.DataFrame({
+            "Fencer": sides["Fencer"].astype(str),
+            "V": (sides["Result"] == "V").astype(int),
+            "TS": sides["TS"].astype(int),
+            "TR": sides["TR"].astype(int),
+        }).groupby("Fencer").agg(Bouts=("V", "size"), V=("V", "sum"), TS=("TS", "sum"), TR=("TR", "sum"))
+        df["D"] = df["Bouts"] - df["V"]
+        df["Difference"] = df["TS"] - df["TR"]
+        df["WinRate"] = df["V"] / df["Bouts"]
+        return df.reset_index().sort_values(["WinRate", "Difference"], ascending=False)[columns].reset_index(drop=True)
@@ -0,0 +1,105 @@
+"""
+Post-poule ranking and predicted tableau seeding.
+
+After the pools fencers are ranked on, in order:
+  1. victory indicator V/M (victories / bouts fenced), higher first,
+  2. indicator TS - TR, higher first,
+  3. touches scored TS, higher first.
+Fencers equal on all three share the same place (ex aequo). For the seeding
+order ties are listed by name, since the real draw between them is random.
+Everything is vectorized so the ranking can be refreshed after every pool.
+"""
+import numpy as np
+import pandas as pd
+
+RANK_KEYS = ["VM", "Difference", "TS"]
+
+
+def _normalize_name(series):
+    return series.astype(str).str.upper().str.split().str.join(" ")
+
+
+def summarize_bouts(df_poules):
+    """
+    Builds the per-fencer summary (Fencer, Nationality, Victories, Defeats, TS, TR,
+    Difference) from the bout table, in order of first appearance.
+    """
+    columns = ["Fencer", "Nationality", "Victories", "Defeats", "TS", "TR", "Difference"]
+    if df_poules.empty:
+        return pd.DataFrame(columns=columns)
+    winner = df_poules["Winner"].astype(object).to_numpy()
+    won1 = winner == df_poules["Fencer1_Name"].astype(object).to_numpy()
+    s1 = df_poules["Fencer1_Score"].astype(int).to_numpy()
+    s2 = df_poules["Fencer2_Score"].astype(int).to_numpy()
+    order = np.arange(len(df_poules)) * 2
+    sides = pd.concat([
+        pd.DataFrame({"Fencer": df_poules["Fencer1_Name"].astype(object).to_numpy(),
+                      "Nationality": df_poules["Fencer1_Nationality"].astype(object).to_numpy(),
+                      "Victories": won1, "TS": s1, "TR": s2, "order": order}),
+        pd.DataFrame({"Fencer": df_poules["Fencer2_Name"].astype(object).to_numpy(),
+                      "Nationality": df_poules["Fencer2_Nationality"].astype(object).to_numpy(),
+                      "Victories": ~won1, "TS": s2, "TR": s1, "order": order + 1}),
+    ], ignore_index=True).sort_values("order", kind="mergesort")
+    sides["Victories"] = sides["Victories"].astype(int)
+    sides["Defeats"] = 1 - sides["Victories"]
+    summary = sides.groupby("Fencer", sort=False).agg(
+        Nationality=("Nationality", "first"),
+        Victories=("Victories", "sum"),
+        Defeats=("Defeats", "sum"),
+        TS=("TS", "sum"),
+        TR=("TR", "sum"),
+    ).reset_index()
+    summary["Difference"] = summary["TS"] - summary["TR"]
+    return summary[columns]
+
+
+def rank_poules(df_summary):
+    """
+    Returns the summary sorted into the official post-poule ranking with two added
+    columns: VM (victory indicator) and Place (equal for fencers tied on V/M, TS-TR and TS).
+    """
+    df = df_summary.copy()
+    if df.empty:
+        df["VM"] = pd.Series(dtype=float)
+        df["Place"] = pd.Series(dtype=int)
+        return df
+    victories = df["Victories"].astype(int)
+    matches = victories + df["Defeats"].astype(int)
+    df["VM"] = (victories / matches.where(matches > 0)).fillna(0.0)
+    df["_name"] = df["Fencer"].astype(str)
+    df = df.sort_values(RANK_KEYS + ["_name"], ascending=[False, False, False, True], kind="mergesort")
+    df = df.drop(columns="_name").reset_index(drop=True)
+    keys = df[RANK_KEYS].astype(float)
+    new_group = keys.ne(keys.shift()).any(axis=1).to_numpy()
+    df["Place"] = np.maximum.accumulate(np.where(new_group, np.arange(1, len(df) + 1), 0))
+    return df
+
+
+def predicted_seeding(df_ranked):
+    """
+    Returns Fencer, Nationality, Place and PredictedSeed (1..n in ranking order)
+    for a summary ranked with rank_poules.
+    """
+    df = df_ranked[["Fencer", "Nationality", "Place"]].copy()
+    df["PredictedSeed"] = np.arange(1, len(df) + 1)
+    df["Tied"] = df["Place"].duplicated(keep=False)
+    return df
+
+
+def compare_seeding(df_ranked, df_fencers):
+    """
+    Compares the predicted seeding with the "(seed)" values scraped from the tableau
+    (df_fencers: Name, Nationality, Seed). Fencers are matched on their normalized
+    name. ScrapedSeed is missing for fencers not found in the tableau (e.g. cut after
+    the pools); Match is True where the scraped seed equals the predicted one.
+    """
+    predicted = predicted_seeding(df_ranked)
+    predicted["_key"] = _normalize_name(predicted["Fencer"])
+    scraped = pd.DataFrame({
+        "_key": _normalize_name(df_fencers["Name"]),
+        "ScrapedSeed": pd.to_numeric(df_fencers["Seed"], errors="coerce"),
+    }).drop_duplicates("_key")
+    df = predicted.merge(scraped, on="_key", how="left").drop(columns="_key")
+    df["ScrapedSeed"] = df["ScrapedSeed"].astype("Int64")
+    df["Match"] = (df["ScrapedSeed"] == df["PredictedSeed"]).fillna(False).astype(bool)
+    return df
@@ -0,0 +1,151 @@
+"""
+Incremental Elo ratings over pool bouts and tableau matches.
+
+Bouts are rated in rating periods: every pool and every tableau round is one
+batch, in chronological order. Within a batch all bouts use the ratings from
+the start of the batch and the deltas are applied together with numpy, so a
+season backfill costs one vectorized step per pool/round rather than a Python
+step per bout. Single bouts can also be streamed in with update().
+
+Each event remembers which bouts (phase, stage, fencer pair) were already
+rated, whether added with add_event() or streamed with update(), so re-adding
+a live event only rates its new bouts. Ratings and those
+keys are saved to a JSON checkpoint; rating a new event after loading one
+costs work proportional to that event's bouts.
+"""
+import json
+import os
+import numpy as np
+import pandas as pd
+from query import event_bouts, name_key, name_keys
+
+
+def _bout_key(phase, stage, key1, key2):
+    return f"{phase}|{stage}|{min(key1, key2)}|{max(key1, key2)}"
+
+
+class EloRatings:
+    def __init__(self, initial=1500.0, k_pool=16.0, k_tableau=32.0):
+        self.initial = initial
+        self.k_pool = k_pool          # pool bouts are 5 touches, so they move ratings less
+        self.k_tableau = k_tableau
+        self.ids = {}                 # name key -> position in the arrays below
+        self.names = []
+        self.ratings = np.empty(0)
+        self.bouts = np.empty(0, dtype=np.int64)
+        self.seen = {}                # event id -> set of rated bout keys
+
+    def _ids_for(self, names):
+        """Integer ids for a Series of fencer names, registering new fencers."""
+        keys = name_keys(names)
+        new = pd.unique(keys[keys.map(self.ids).isna()])
+        if len(new):
+            first_names = names.groupby(keys.to_numpy(), sort=False).first()
+            for key in new:
+                self.ids[key] = len(self.names)
+                self.names.append(str(first_names[key]))
+            self.ratings = np.concatenate([self.ratings, np.full(len(new), self.initial)])
+            self.bouts = np.concatenate([self.bouts, np.zeros(len(new), dtype=np.int64)])
+        return keys.map(self.ids).to_numpy(dtype=np.int64)
+
+    def rate_bouts(self, bouts):
+        """
+        Rates a chronologically ordered frame of bouts (see query.event_bouts), one
+        batch per (Phase, Stage) in order of first appearance.
+        """
+        if bouts.empty:
+            return
+        bouts = bouts.reset_index(drop=True)
+        ids1 = self._ids_for(bouts["Fencer1"].astype(str))
+        ids2 = self._ids_for(bouts["Fencer2"].astype(str))
+        score = bouts["Won1"].astype(bool).to_numpy().astype(float)
+        k = np.where(bouts["Phase"].to_numpy() == "tableau", self.k_tableau, self.k_pool)
+        batch = bouts.groupby(["Phase", "Stage"], sort=False).ngroup().to_numpy()
+        order = np.argsort(batch, kind="stable")
+        for idx in np.split(order, np.flatnonzero(np.diff(batch[order])) + 1):
+            a, b = ids1[idx], ids2[idx]
+            expected = 1.0 / (1.0 + 10.0 ** ((self.ratings[b] - self.ratings[a]) / 400.0))
+            delta = k[idx] * (score[idx] - expected)
+            np.add.at(self.ratings, a, delta)
+            np.add.at(self.ratings, b, -delta)
+            np.add.at(self.bouts, a, 1)
+            np.add.at(self.bouts, b, 1)
+
+    def add_event(self, event_id, df_poules=None, df_matches=None):
+        """
+        Rates the bouts of an event not rated before (all of them for a new event, only
+        the newly finished ones for a live event added again). Returns how many were rated.
+        """
+        bouts = event_bouts(df_poules, df_matches)
+        if bouts.empty:
+            return 0
+        k1 = name_keys(bouts["Fencer1"]).to_numpy()
+        k2 = name_keys(bouts["Fencer2"]).to_numpy()
+        # same layout as _bout_key, vectorized
+        keys = (bouts["Phase"].astype(str) + "|" + bouts["Stage"].astype(str) + "|"
+                + np.where(k1 < k2, k1, k2) + "|" + np.where(k1 < k2, k2, k1))
+        seen = self.seen.setdefault(str(event_id), set())
+        fresh = ~keys.isin(seen).to_numpy()
+        self.rate_bouts(bouts[fresh])
+        seen.update(keys[fresh])
+        return int(fresh.sum())
+
+    def backfill(self, events):
+        """Rates an iterable of (event_id, df_poules, df_matches) in chronological order."""
+        return sum(self.add_event(event_id, df_poules, df_matches) for event_id, df_poules, df_matches in events)
+
+    def update(self, event_id, phase, stage, fencer1, fencer2, fencer1_won):
+        """
+        Rates a single streamed bout immediately; returns the rating change of fencer1.
+        phase ("pool" or "tableau") and stage (pool number or tableau round, as in
+        query.event_bouts) identify the bout within the event: it is recorded as rated,
+        and a bout already rated (streamed before or added with add_event) changes nothing.
+        """
+        key = _bout_key(phase, stage, name_key(fencer1), name_key(fencer2))
+        seen = self.seen.setdefault(str(event_id), set())
+        if key in seen:
+            return 0.0
+        seen.add(key)
+        ids = self._ids_for(pd.Series([str(fencer1), str(fencer2)]))
+        a, b = ids[0], ids[1]
+        k = self.k_tableau if phase == "tableau" else self.k_pool
+        expected = 1.0 / (1.0 + 10.0 ** ((self.ratings[b] - self.ratings[a]) / 400.0))
+        delta = k * (float(bool(fencer1_won)) - expected)
+        self.ratings[a] += delta
+        self.ratings[b] -= delta
+        self.bouts[a] += 1
+        self.bouts[b] += 1
+        return delta
+
+    def rating(self, fencer):
+        i = self.ids.get(name_key(fencer))
+        return self.initial if i is None else float(self.ratings[i])
+
+    def table(self):
+        """All rated fencers (Fencer, Rating, Bouts), highest rating first."""
+        df = pd.DataFrame({"Fencer": self.names, "Rating": self.ratings.round(1), "Bouts": self.bouts})
+        return df.sort_values(["Rating", "Fencer"], ascending=[False, True]).reset_index(drop=True)
+
+    def save_checkpoint(self, path):
+        state = {
+            "initial": self.initial, "k_pool": self.k_pool, "k_tableau": self.k_tableau,
+            "keys": list(self.ids), "names": self.names,
+            "ratings": self.ratings.tolist(), "bouts": self.bouts.tolist(),
+            "seen": {event_id: sorted(keys) for event_id, keys in self.seen.items()},
+        }
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load_checkpoint(cls, path):
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+        ratings = cls(state["initial"], state["k_pool"], state["k_tableau"])
+        ratings.ids = {key: i for i, key in enumerate(state["keys"])}
+        ratings.names = state["names"]
+        ratings.ratings = np.array(state["ratings"], dtype=float)
+        ratings.bouts = np.array(state["bouts"], dtype=np.int64)
+        ratings.seen = {event_id: set(keys) for event_id, keys in state["seen"].items()}
+        return ratings
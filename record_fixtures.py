@@ -0,0 +1,129 @@
+"""
+Records a live FencingTimeLive event into the mock_server.py fixture layout, so
+the profiler and loadtest.py can replay it offline.
+
+The tournament or event page is discovered with discovery.py and every page it
+loaded is saved (links made root-relative so they resolve on the mock). Then,
+for every phase of the manifest:
+  pools     the pools page is loaded, its pool sheet URLs captured and each sheet
+            saved as pools/scores/<event>/<round>.pools/<N>.html
+  tableaus  the tableau is moved back to its first window with #prevBut, then the
+            table.elimTableau of each window is saved in order, as
+            tableaus/scores/<event>/<id>.windows/NN.html, while #nextBut changes it
+
+Usage:
+  python record_fixtures.py https://www.fencingtimelive.com/events/view/<id> --out fixtures
+"""
+import argparse
+import os
+import time
+from urllib.parse import urlsplit
+import requests
+from bs4 import BeautifulSoup
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from bracket import BracketAssembler
+from capture import DEFAULT_CAPTURE, get_chrome_driver, capture_urls
+from discovery import discover, load_page
+
+HEADERS = {
+    "User-Agent": ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                   "AppleWebKit/537.36 (KHTML, like Gecko) "
+                   "Chrome/120.0.0.0"),
+    "Accept": "text/html, */*; q=0.01"
+}
+
+
+def fixture_path(out, url, suffix=""):
+    return os.path.join(out, *urlsplit(url).path.strip("/").split("/")) + suffix
+
+
+def save(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def record_pools(url, out, capture=DEFAULT_CAPTURE):
+    """Saves every pool sheet of the pools page; returns the number saved."""
+    driver = get_chrome_driver(capture)
+    try:
+        driver.get(url)
+        time.sleep(3)
+        pool_urls = capture_urls(driver, capture)
+    finally:
+        driver.quit()
+    saved = 0
+    for number, pool_url in enumerate(pool_urls, 1):
+        response = requests.get(pool_url, headers=HEADERS)
+        if response.status_code != 200:
+            print(f"  pool {number}: HTTP {response.status_code}, skipped")
+            continue
+        save(os.path.join(fixture_path(out, url, ".pools"), f"{number}.html"), response.text)
+        saved += 1
+    return saved
+
+
+def _tableau_html(page_source):
+    return str(BeautifulSoup(page_source, "html.parser").find("table", class_="elimTableau"))
+
+
+def record_tableau(url, out, max_clicks=20):
+    """Saves every window of the tableau, first rounds first; returns the number saved."""
+    driver = get_chrome_driver()
+    try:
+        driver.get(url)
+        WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, "table.elimTableau")))
+        time.sleep(1)
+        assembler = BracketAssembler()
+        assembler.add_page(driver.page_source)
+        for _ in range(max_clicks):
+            before = assembler.last_headers
+            driver.find_element(By.ID, "prevBut").click()
+            time.sleep(2)
+            assembler.add_page(driver.page_source)
+            if assembler.last_headers == before:
+                break
+        windows = [_tableau_html(driver.page_source)]
+        for _ in range(max_clicks):
+            before = assembler.last_headers
+            driver.find_element(By.ID, "nextBut").click()
+            time.sleep(2)
+            assembler.add_page(driver.page_source)
+            if assembler.last_headers == before:
+                break
+            windows.append(_tableau_html(driver.page_source))
+    finally:
+        driver.quit()
+    for index, html in enumerate(windows):
+        save(os.path.join(fixture_path(out, url, ".windows"), f"{index:02d}.html"), html)
+    return len(windows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record a live event as mock_server.py fixtures.")
+    parser.add_argument("url", help="tournament or event page")
+    parser.add_argument("--out", default="fixtures", help="fixtures directory")
+    parser.add_argument("--capture", default=DEFAULT_CAPTURE, help="pool URL capture backend")
+    args = parser.parse_args()
+
+    pages = {}
+
+    def load(page_url):
+        pages[page_url] = load_page(page_url)
+        return pages[page_url]
+
+    manifest = discover(args.url, load=load)
+    for page_url, html in pages.items():
+        parts = urlsplit(page_url)
+        save(fixture_path(args.out, page_url, ".html"), html.replace(f"{parts.scheme}://{parts.netloc}", ""))
+    for event in manifest["events"]:
+        for phase in event["pools"]:
+            print(f"{event['id']}/pools-{phase['id']}: {record_pools(phase['url'], args.out, args.capture)} sheets")
+        for phase in event["tableaus"]:
+            print(f"{event['id']}/tableaus-{phase['id']}: {record_tableau(phase['url'], args.out)} windows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Compact in-memory schema for the scraped DataFrames.
+
+Fencer names, nations, pool labels and rounds are stored as categoricals and
+scores/seeds as small integers. Derived strings (like the poule "Score"
+column) are not stored; they are rebuilt on demand for display and export.
+"""
+import pandas as pd
+
+SCORE_DTYPE = "uint8"
+SEED_DTYPE = "UInt16"  # nullable: BYEs and empty bracket slots have no seed
+COUNT_DTYPE = "uint8"
+TOUCHES_DTYPE = "uint16"
+DIFFERENCE_DTYPE = "int16"
+PLACE_DTYPE = "uint16"
+VM_DTYPE = "float32"
+
+POULES_COLUMNS = [
+    "PoolNumber",
+    "Fencer1_Name", "Fencer1_Nationality", "Fencer1_Score",
+    "Fencer2_Name", "Fencer2_Nationality", "Fencer2_Score",
+    "Winner",
+]
+SUMMARY_COLUMNS = ["Place", "Fencer", "Nationality", "Victories", "Defeats", "VM", "TS", "TR", "Difference"]
+MATCHES_COLUMNS = [
+    "Round",
+    "Fencer1", "Fencer1_Seed", "Fencer1_Nationality",
+    "Fencer2", "Fencer2_Seed", "Fencer2_Nationality",
+    "Winner", "Score",
+]
+FENCERS_COLUMNS = ["Name", "Nationality", "Seed"]
+
+
+def _shared_category(df, columns):
+    """
+    Builds one CategoricalDtype covering the values of several columns, so that
+    e.g. Fencer1_Name, Fencer2_Name and Winner share codes and compare cheaply.
+    """
+    values = pd.concat([df[col].astype(object) for col in columns], ignore_index=True)
+    values = values.dropna()
+    return pd.CategoricalDtype(sorted(pd.unique(values)))
+
+
+def _ordered_category(series):
+    """Ordered categorical keeping the order in which values first appear (pools, rounds)."""
+    return pd.Categorical(series, categories=pd.unique(series.dropna()), ordered=True)
+
+
+def _seed_column(series):
+    return pd.to_numeric(series, errors="coerce").astype(SEED_DTYPE)
+
+
+def compact_poules(df_poules):
+    """
+    Returns the bout DataFrame in the compact schema (POULES_COLUMNS).
+    The redundant "Score" string column is dropped; use with_score_column() to render it.
+    """
+    if df_poules.empty:
+        return pd.DataFrame(columns=POULES_COLUMNS)
+    df = df_poules.drop(columns=["Score"], errors="ignore").copy()
+    names = _shared_category(df, ["Fencer1_Name", "Fencer2_Name", "Winner"])
+    nations = _shared_category(df, ["Fencer1_Nationality", "Fencer2_Nationality"])
+    df["PoolNumber"] = _ordered_category(df["PoolNumber"])
+    for col in ("Fencer1_Name", "Fencer2_Name", "Winner"):
+        df[col] = df[col].astype(names)
+    for col in ("Fencer1_Nationality", "Fencer2_Nationality"):
+        df[col] = df[col].astype(nations)
+    for col in ("Fencer1_Score", "Fencer2_Score"):
+        df[col] = df[col].astype(SCORE_DTYPE)
+    return df[POULES_COLUMNS].reset_index(drop=True)
+
+
+def compact_summary(df_summary):
+    """
+    Returns the ranked poules summary (see ranking.rank_poules) in the compact
+    schema, preserving its row order.
+    """
+    if df_summary.empty:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
+    df = df_summary.copy()
+    df["Fencer"] = df["Fencer"].astype("category")
+    df["Nationality"] = df["Nationality"].astype("category")
+    for col in ("Victories", "Defeats"):
+        df[col] = df[col].astype(COUNT_DTYPE)
+    for col in ("TS", "TR"):
+        df[col] = df[col].astype(TOUCHES_DTYPE)
+    df["Difference"] = df["Difference"].astype(DIFFERENCE_DTYPE)
+    df["Place"] = df["Place"].astype(PLACE_DTYPE)
+    df["VM"] = df["VM"].astype(VM_DTYPE)
+    return df[SUMMARY_COLUMNS]
+
+
+def compact_matches(df_matches):
+    """
+    Returns the tableau matches in the compact schema (MATCHES_COLUMNS).
+    Expects Fencer1/Fencer2/Winner to already hold clean names and the
+    *_Seed/*_Nationality columns to be split out of the raw "(seed) NAME NAT" strings.
+    """
+    if df_matches.empty:
+        return pd.DataFrame(columns=MATCHES_COLUMNS)
+    df = df_matches.copy()
+    names = _shared_category(df, ["Fencer1", "Fencer2", "Winner"])
+    nations = _shared_category(df, ["Fencer1_Nationality", "Fencer2_Nationality"])
+    df["Round"] = _ordered_category(df["Round"])
+    for col in ("Fencer1", "Fencer2", "Winner"):
+        df[col] = df[col].astype(names)
+    for col in ("Fencer1_Nationality", "Fencer2_Nationality"):
+        df[col] = df[col].astype(nations)
+    for col in ("Fencer1_Seed", "Fencer2_Seed"):
+        df[col] = _seed_column(df[col])
+    df["Score"] = df["Score"].astype("category")
+    return df[MATCHES_COLUMNS].reset_index(drop=True)
+
+
+def compact_fencers(df_fencers):
+    """Returns the fencers table in the compact schema, preserving its row order."""
+    if df_fencers.empty:
+        return pd.DataFrame(columns=FENCERS_COLUMNS)
+    df = df_fencers.copy()
+    df["Name"] = df["Name"].astype("category")
+    df["Nationality"] = df["Nationality"].astype("category")
+    df["Seed"] = _seed_column(df["Seed"])
+    return df[FENCERS_COLUMNS]
+
+
+def with_score_column(df_poules):
+    """
+    Returns a copy of the bout DataFrame with the "Score" string ("5-3") rebuilt
+    from the integer score columns, in the column order of poules_matches.csv.
+    """
+    df = df_poules.copy()
+    score = df["Fencer1_Score"].astype(str) + "-" + df["Fencer2_Score"].astype(str)
+    df.insert(df.columns.get_loc("Winner"), "Score", score)
+    return df
+
+
+def memory_report(frames):
+    """
+    Given a dict of {name: DataFrame}, returns a DataFrame with one row per frame
+    giving its shape and deep memory usage in bytes.
+    """
+    rows = []
+    for name, df in frames.items():
+        total = int(df.memory_usage(index=True, deep=True).sum())
+        rows.append({
+            "Frame": name,
+            "Rows": len(df),
+            "Columns": df.shape[1],
+            "Bytes": total,
+            "BytesPerRow": round(total / len(df), 1) if len(df) else 0.0,
+        })
+    return pd.DataFrame(rows, columns=["Frame", "Rows", "Columns", "Bytes", "BytesPerRow"])
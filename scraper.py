@@ -0,0 +1,277 @@
+"""
+Scrape pipeline shared by the Streamlit app, the API service and the scripts:
+tableau navigation and match building, pool sheet extraction, and
+scrape_event, which runs both over every phase that discovery.py finds for an
+event. Nothing here depends on Streamlit.
+"""
+import re
+import time
+import pandas as pd
+import requests
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from capture import DEFAULT_CAPTURE, get_chrome_driver, capture_urls, check_memory, memory_warning
+from completion import event_complete
+from discovery import discover, primary_event, scrape_manifest
+from profiling import StageProfiler
+from bracket import BracketAssembler, split_fencers, build_fencers_table
+from pools import parse_pool_sheet, pool_results
+from ranking import summarize_bouts, rank_poules
+from schema import compact_poules, compact_summary, compact_matches, compact_fencers
+
+# ---------------- Helper Functions ----------------
+
+def filter_series_with_seed(series):
+    pattern = r'^\(\d+\)'
+    return series[series.str.match(pattern, na=False)].reset_index(drop=True)
+
+def extract_seed(fencer_str):
+    m = re.match(r'^\((\d+)\)', fencer_str)
+    return m.group(1) if m else None
+
+def simple_score_extractor(cell):
+    return cell.strip() if cell.strip() else "BYE"
+
+def extract_poules_results(pools_url, capture=DEFAULT_CAPTURE, profiler=None):
+    """
+    Captures the pool sheet URLs of the pools page and parses every sheet. Returns
+    (df_poules, df_poules_summary, df_pool_checks) where df_pool_checks has a row for
+    every captured pool URL: it flags pools whose totals on the site disagree with
+    their bouts, and pools that could not be fetched or parsed (Error).
+    profiler, a profiling.StageProfiler, profiles the capture and sheets stages.
+    """
+    profiler = profiler or StageProfiler(None, enabled=False)
+    profiler.start("capture")
+    driver = get_chrome_driver(capture)
+    try:
+        driver.get(pools_url)
+        time.sleep(3)
+        pool_urls = capture_urls(driver, capture)
+    finally:
+        driver.quit()
+    profiler.start("sheets")
+    results = pool_sheet_results(pool_urls)
+    profiler.stop()
+    return results
+
+def pool_sheet_results(pool_urls):
+    """Fetches and parses the given pool sheet URLs; same result as extract_poules_results."""
+    sheets = []
+    failed = []  # (pool label, reason) for every captured pool that did not parse
+    pool_counter = 1
+    for pool_url in pool_urls:
+        headers = {
+            "User-Agent": ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                           "AppleWebKit/537.36 (KHTML, like Gecko) "
+                           "Chrome/120.0.0.0"),
+            "Accept": "text/html, */*; q=0.01"
+        }
+        label = f"Pool #{pool_counter}"
+        pool_counter += 1
+        try:
+            response = requests.get(pool_url, headers=headers)
+        except requests.RequestException as e:
+            failed.append((label, f"fetch failed: {e}"))
+            continue
+        if response.status_code != 200:
+            failed.append((label, f"HTTP {response.status_code}"))
+            continue
+        sheet = parse_pool_sheet(response.text, label)
+        if sheet is None:
+            failed.append((label, "no pool table"))
+            continue
+        sheets.append(sheet)
+    df_poules, df_summary_rows, df_pool_checks = pool_results(sheets, failed)
+    if df_summary_rows is None:
+        # Some pool lacks the site's totals or they disagree with the bouts: recompute.
+        df_summary_rows = summarize_bouts(df_poules)
+    df_poules_summary = rank_poules(df_summary_rows)
+    check_memory("pool extraction")
+    return compact_poules(df_poules), compact_summary(df_poules_summary), df_pool_checks
+
+# ---------------- Tableau ----------------
+
+def extract_tableau_results(tableau_url, profiler=None):
+    """
+    Navigates the tableau at tableau_url and returns (df_matches, df_fencers) in
+    the compact schema. profiler, a profiling.StageProfiler, profiles the navigate,
+    assemble, matches and fencers stages (as in tableau.py).
+    """
+    profiler = profiler or StageProfiler(None, enabled=False)
+    profiler.start("navigate")
+    driver = get_chrome_driver()
+    try:
+        driver.get(tableau_url)
+        WebDriverWait(driver, 20).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, "table.elimTableau"))
+        )
+        time.sleep(1)
+        # Keep the round columns seen so far and only parse newly revealed ones;
+        # stop in each direction once a click leaves the visible rounds unchanged.
+        assembler = BracketAssembler()
+        assembler.add_page(driver.page_source)
+        for i in range(4):
+            before = assembler.last_headers
+            try:
+                driver.find_element(By.ID, "prevBut").click()
+            except Exception:
+                break
+            time.sleep(2)
+            assembler.add_page(driver.page_source)
+            if assembler.last_headers == before:
+                break
+
+        # After going back, the first nextBut clicks only show rounds already seen,
+        # so "nothing new" is not the end; only an unchanged page or the final is.
+        for i in range(10):
+            if assembler.final_reached:
+                break
+            before = assembler.last_headers
+            try:
+                driver.find_element(By.ID, "nextBut").click()
+            except Exception:
+                break
+            time.sleep(2)
+            assembler.add_page(driver.page_source)
+            if assembler.last_headers == before:
+                break
+    finally:
+        driver.quit()
+    profiler.start("assemble")
+    df_main = assembler.to_frame()
+    df_main = df_main.dropna(axis=1, how='all')
+
+    # --- Build final matches table ---
+    filtered_dict = {}
+    for col in df_main.columns:
+        filtered_series = filter_series_with_seed(df_main[col].astype(str))
+        filtered_dict[col] = filtered_series
+    df_filtered = pd.DataFrame({k: pd.Series(v) for k, v in filtered_dict.items()})
+    rounds = list(df_filtered.columns)
+    if rounds and (not rounds[-1].strip()):
+        if not df_filtered[rounds[-1]].eq("").all():
+            rounds[-1] = "Winner"
+        else:
+            rounds = rounds[:-1]
+            df_filtered = df_filtered.iloc[:, :-1]
+    df_filtered.columns = rounds
+
+    profiler.start("matches")
+    final_matches = []
+    num_rounds = len(rounds)
+    for i, round_name in enumerate(rounds):
+        col_values = df_filtered[round_name].dropna().tolist()
+        num_matches_in_round = len(col_values) // 2
+        for j in range(num_matches_in_round):
+            fencer1 = col_values[2*j]
+            fencer2 = col_values[2*j + 1]
+            winner = ""
+            score = ""
+            if i + 1 < num_rounds:
+                next_round = rounds[i+1]
+                next_values = df_filtered[next_round].dropna().tolist()
+                seed1 = extract_seed(fencer1)
+                seed2 = extract_seed(fencer2)
+                for candidate in next_values:
+                    candidate_seed = extract_seed(candidate)
+                    if candidate_seed == seed1:
+                        winner = fencer1
+                        score = ""  # Score will be filled below
+                        break
+                    elif candidate_seed == seed2:
+                        winner = fencer2
+                        score = ""
+                        break
+            # In the last round assembled there is no next column to find the winner in:
+            # the winner stays empty rather than guessed, so an unfenced final is not complete.
+            final_matches.append({
+                "Round": round_name,
+                "Fencer1": fencer1,
+                "Fencer2": fencer2,
+                "Winner": winner,
+                "Score": score
+            })
+    df_matches = pd.DataFrame(final_matches)
+
+    # --- SCORE EXTRACTION using df_main ---
+    score_list = []
+    for col in df_main.columns[1:]:
+        col_data = df_main[col].tolist()
+        col_scores = []
+        i = 0
+        while i < len(col_data):
+            if re.match(r'^\(\d+\)', col_data[i]):
+                if i + 1 < len(col_data):
+                    score = simple_score_extractor(col_data[i+1])
+                else:
+                    score = "BYE"
+                col_scores.append(score)
+                i += 2
+            else:
+                i += 1
+        score_list.extend(col_scores)
+    cleaned_score_list = [re.sub(r'\s*Ref.*$', '', s).strip() for s in score_list]
+
+    if len(cleaned_score_list) < len(df_matches):
+        cleaned_score_list += [""] * (len(df_matches) - len(cleaned_score_list))
+    elif len(cleaned_score_list) > len(df_matches):
+        cleaned_score_list = cleaned_score_list[:len(df_matches)]
+
+    df_matches['Score'] = cleaned_score_list
+
+    # --- Build Fencers Table ---
+    profiler.start("fencers")
+    df_matches = split_fencers(df_matches)
+    df_fencers = build_fencers_table(df_matches)
+    df_matches = compact_matches(df_matches)
+    df_fencers = compact_fencers(df_fencers)
+    profiler.stop()
+    check_memory("tableau extraction")
+    return df_matches, df_fencers
+
+# ---------------- Full Event ----------------
+
+def scrape_event(base_url, capture=DEFAULT_CAPTURE, progress=None, profiler=None, manifest_cache=None,
+                 workers=1, event_id=None):
+    """
+    Runs the whole pipeline for the event page at base_url. The page is loaded once
+    to discover the event's phases (see discovery.py; manifest_cache, a
+    discovery.ManifestCache, reuses an earlier discovery), then every pool round and
+    tableau is scraped, at most `workers` at a time. Each of them opens a browser;
+    the default of one keeps a scrape to one browser, so the job queue and the API
+    bound browsers by their own worker counts. With event_id, that event of the
+    manifest is scraped (an error if the page does not list it) rather than the first.
+
+    Returns a dict with the DataFrames of the event's main tableau and first pool
+    round (matches, fencers, poules, summary, pool_checks), "event" (the
+    FencingTimeLive event id, e.g. for snapshot.SnapshotStore), "phases" (one entry per
+    phase from discovery.scrape_manifest, each with its own frames or error),
+    "complete", which holds only when every phase was scraped and is complete, and
+    "warnings", messages for the user such as the process passing its memory ceiling.
+    progress, if given, is called with a short description as each stage starts;
+    profiler, a profiling.StageProfiler, profiles each stage separately.
+    """
+    progress = progress or (lambda stage: None)
+    profiler = profiler or StageProfiler(None, enabled=False)
+    progress("Discovering the event's phases...")
+    with profiler.stage("discover"):
+        event = primary_event(discover(base_url, manifest_cache, workers), event_id)
+    if event is None and event_id is not None:
+        raise Exception(f"Event {event_id} was not found on {base_url}.")
+    if event is None or not event["tableaus"]:
+        raise Exception("Could not locate a tableau link. Please verify the page layout or URL.")
+    if not event["pools"]:
+        raise Exception("Could not locate the pools link element. Please verify the page layout or URL.")
+    progress(f"Scraping {len(event['tableaus'])} tableau(s) and {len(event['pools'])} pool round(s)...")
+    phases = scrape_manifest({"events": [event]}, capture, workers, profiler)
+    warning = memory_warning("scraping the event")
+    if warning:
+        progress(warning)
+    tableau = next(phase for phase in phases if phase["kind"] == "tableaus")
+    pools = next(phase for phase in phases if phase["kind"] == "pools")
+    for phase in (tableau, pools):
+        if "error" in phase:
+            raise Exception(phase["error"])
+    return dict(tableau["frames"], **pools["frames"], event=event["id"], phases=phases,
+                complete=event_complete(phases), warnings=[warning] if warning else [])
@@ -0,0 +1,271 @@
+"""
+Versioned, differential snapshots of scraped events.
+
+Each write compares an event's tables (poules, summary, matches, fencers) with
+the last snapshot and appends only the rows that were added, changed or
+removed as one delta file per table and version. Rows are identified by a
+stable key rather than their position:
+  - poules:  pool + fencer pair (order-independent),
+  - matches: round + fencer pair (plus an occurrence number for open slots),
+  - fencers, summary: fencer name.
+
+Layout under the snapshot root:
+  <event>/manifest.json                current version, base version and row hashes
+  <event>/<table>/<version>.delta.csv  Key, Op ("upsert"/"delete") and the row
+  <event>/<table>/<version>.base.csv   every live row as of a compaction
+
+Consumers remember the last version they applied and call changes_since();
+compact() folds the deltas into a new base so replay stays short. write() and
+compact() hold a per-event lock (a lock file under the event directory, plus a
+thread lock) so concurrent scrapes of one event never share a version.
+
+Usage:
+  python snapshot.py export EVENT --poules poules_matches.csv --summary poules_summary.csv
+  python snapshot.py changes EVENT poules --since 3
+  python snapshot.py compact [EVENT ...]
+"""
+import argparse
+import json
+import os
+import threading
+from contextlib import contextmanager
+import pandas as pd
+from query import name_keys
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_ROOT = ".ftl_snapshots"
+UPSERT = "upsert"
+DELETE = "delete"
+
+
+def _pair_keys(df, stage, first, second):
+    """stage|A|B with the pair sorted, numbered when the same key occurs more than once."""
+    k1, k2 = name_keys(df[first]), name_keys(df[second])
+    low, high = k1.where(k1 <= k2, k2), k2.where(k1 <= k2, k1)
+    keys = df[stage].astype(str) + "|" + low + "|" + high
+    repeat = keys.groupby(keys, sort=False).cumcount()
+    return keys.where(repeat == 0, keys + "|" + repeat.astype(str))
+
+
+TABLE_KEYS = {
+    "poules": lambda df: _pair_keys(df, "PoolNumber", "Fencer1_Name", "Fencer2_Name"),
+    "summary": lambda df: name_keys(df["Fencer"]),
+    "matches": lambda df: _pair_keys(df, "Round", "Fencer1", "Fencer2"),
+    "fencers": lambda df: name_keys(df["Name"]),
+}
+
+
+def _as_text(df):
+    """The table as strings, missing values as "", so hashes and CSV round-trips agree."""
+    return df.astype(object).where(df.notna(), "").astype(str).reset_index(drop=True)
+
+
+def _write_csv(df, path):
+    tmp = path + ".tmp"
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def _read_csv(path):
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+@contextmanager
+def _event_lock(event_dir):
+    """Exclusive lock on one event directory, across threads and processes."""
+    path = os.path.abspath(event_dir)
+    with _thread_locks_guard:
+        thread_lock = _thread_locks.setdefault(path, threading.Lock())
+    with thread_lock:
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, ".lock"), "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class SnapshotStore:
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+
+    def _event_dir(self, event_id):
+        return os.path.join(self.root, str(event_id))
+
+    def manifest(self, event_id):
+        try:
+            with open(os.path.join(self._event_dir(event_id), "manifest.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"version": 0, "tables": {}}
+
+    def _save_manifest(self, event_id, manifest):
+        path = os.path.join(self._event_dir(event_id), "manifest.json")
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, path)
+
+    def _files(self, event_id, table, kind):
+        """(version, path) of a table's delta or base files, oldest first."""
+        path = os.path.join(self._event_dir(event_id), table)
+        if not os.path.isdir(path):
+            return []
+        suffix = f".{kind}.csv"
+        return sorted((int(name[:-len(suffix)]), os.path.join(path, name))
+                      for name in os.listdir(path) if name.endswith(suffix))
+
+    def write(self, event_id, frames):
+        """
+        Appends the changes in frames ({table: DataFrame}, e.g. the dict returned by
+        scraper.scrape_event) as a new version. Returns (version, {table: (upserts, deletes)});
+        the version is unchanged when nothing changed.
+        """
+        with _event_lock(self._event_dir(event_id)):
+            return self._write(event_id, frames)
+
+    def _write(self, event_id, frames):
+        manifest = self.manifest(event_id)
+        version = manifest["version"] + 1
+        counts = {}
+        deltas = {}
+        for table, df in frames.items():
+            if table not in TABLE_KEYS or df is None:
+                continue
+            state = manifest["tables"].setdefault(table, {"base": 0, "hashes": {}})
+            rows = _as_text(df)
+            keys = TABLE_KEYS[table](df).reset_index(drop=True)
+            hashes = pd.util.hash_pandas_object(rows, index=False).astype(str)
+            old = state["hashes"]
+            changed = [old.get(key) != value for key, value in zip(keys, hashes)]
+            removed = sorted(set(old) - set(keys))
+            counts[table] = (sum(changed), len(removed))
+            if not any(changed) and not removed:
+                continue
+            upserts = rows[changed]
+            upserts.insert(0, "Op", UPSERT)
+            upserts.insert(0, "Key", keys[changed])
+            deletes = pd.DataFrame("", index=range(len(removed)), columns=upserts.columns)
+            deletes["Key"], deletes["Op"] = removed, DELETE
+            deltas[table] = pd.concat([upserts, deletes], ignore_index=True)
+            state["hashes"] = dict(zip(keys, hashes))
+        if not deltas:
+            return manifest["version"], counts
+        for table, delta in deltas.items():
+            os.makedirs(os.path.join(self._event_dir(event_id), table), exist_ok=True)
+            _write_csv(delta, os.path.join(self._event_dir(event_id), table, f"{version:06d}.delta.csv"))
+        manifest["version"] = version
+        self._save_manifest(event_id, manifest)
+        return version, counts
+
+    def changes_since(self, event_id, table, since=0):
+        """
+        Returns (ops, reset): the Key/Op rows of a table written after version `since`,
+        oldest first. When those versions were compacted away, reset is True and ops
+        starts with every row of the base, which replaces the consumer's copy.
+        """
+        base = self.manifest(event_id)["tables"].get(table, {}).get("base", 0)
+        parts = []
+        reset = since < base
+        if reset:
+            for version, path in self._files(event_id, table, "base"):
+                if version == base:
+                    rows = _read_csv(path)
+                    rows.insert(1, "Op", UPSERT)
+                    parts.append(rows)
+        parts += [_read_csv(path) for version, path in self._files(event_id, table, "delta")
+                  if version > max(since, base)]
+        if not parts:
+            return pd.DataFrame(columns=["Key", "Op"]), reset
+        return pd.concat(parts, ignore_index=True).fillna(""), reset
+
+    def materialize(self, event_id, table):
+        """The current rows of a table (values as strings) with their Key."""
+        ops, _ = self.changes_since(event_id, table, since=-1)
+        ops = ops.drop_duplicates("Key", keep="last")
+        rows = ops[ops["Op"] == UPSERT].drop(columns="Op")
+        return rows.reset_index(drop=True)
+
+    def compact(self, event_id):
+        """Writes each table's current rows as a base at the latest version and drops older files."""
+        with _event_lock(self._event_dir(event_id)):
+            return self._compact(event_id)
+
+    def _compact(self, event_id):
+        manifest = self.manifest(event_id)
+        version = manifest["version"]
+        for table, state in manifest["tables"].items():
+            if state["base"] == version:
+                continue
+            old_files = self._files(event_id, table, "base") + self._files(event_id, table, "delta")
+            rows = self.materialize(event_id, table)
+            _write_csv(rows, os.path.join(self._event_dir(event_id), table, f"{version:06d}.base.csv"))
+            state["base"] = version
+            self._save_manifest(event_id, manifest)
+            for _, path in old_files:
+                os.remove(path)
+        return version
+
+    def events(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.isfile(os.path.join(self.root, name, "manifest.json")))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Differential snapshots of scraped events.")
+    parser.add_argument("--root", default=os.environ.get("FTL_SNAPSHOT_DIR", DEFAULT_ROOT))
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="append the changes in CSV exports as a new version")
+    export.add_argument("event")
+    for table in TABLE_KEYS:
+        export.add_argument(f"--{table}", metavar="CSV")
+    changes = commands.add_parser("changes", help="print a table's changes after a version")
+    changes.add_argument("event")
+    changes.add_argument("table", choices=list(TABLE_KEYS))
+    changes.add_argument("--since", type=int, default=0)
+    compact = commands.add_parser("compact", help="fold deltas into a new base (all events by default)")
+    compact.add_argument("events", nargs="*")
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.root)
+    if args.command == "export":
+        frames = {table: pd.read_csv(getattr(args, table), dtype=str, keep_default_na=False)
+                  for table in TABLE_KEYS if getattr(args, table)}
+        if "poules" in frames:
+            frames["poules"] = frames["poules"].drop(columns=["Score"], errors="ignore")
+        version, counts = store.write(args.event, frames)
+        for table, (upserts, deletes) in counts.items():
+            print(f"{table}: {upserts} upserted, {deletes} deleted")
+        print(f"{args.event} is at version {version}")
+    elif args.command == "changes":
+        ops, reset = store.changes_since(args.event, args.table, args.since)
+        if reset:
+            print("The requested versions were compacted; the output starts with a full base.")
+        print(ops.to_csv(index=False), end="")
+    else:
+        for event_id in args.events or store.events():
+            print(f"{event_id}: compacted at version {store.compact(event_id)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,18 @@
 import re
+import os
 import time
 import requests
 import pandas as pd
-from bs4 import BeautifulSoup
 from seleniumwire import webdriver  # Selenium Wire captures network requests
 from selenium.webdriver.common.by import By
 from selenium.webdriver.edge.options import Options as EdgeOptions
 from selenium.webdriver.edge.service import Service
 from webdriver_manager.microsoft import EdgeChromiumDriverManager
+from profiling import script_profiler
+from snapshot import SnapshotStore
+from capture import WIRE_OPTIONS, WIRE_SCOPES, check_memory
+from bracket import BracketAssembler, split_fencers, build_fencers_table
+from schema import compact_matches, compact_fencers, memory_report
 
 #####################################
 # Define headers for requests
@@ -22,52 +27,6 @@ headers = {
 #####################################
 # Helper functions
 #####################################
-def extract_full_bracket_table(html):
-    """
-    Parses the bracket HTML and returns a tuple (header, matrix) where:
-      - header is a list of column names from the first row with <th> tags.
-      - matrix is a list of rows (each row is a list of strings for each column),
-        padded to the maximum number of cells found in any row.
-    Blank cells are preserved.
-    """
-    soup = BeautifulSoup(html, "html.parser")
-    table = soup.find("table", class_="elimTableau")
-    if not table:
-        raise Exception("Could not find the bracket table with class 'elimTableau'.")
-    
-    rows = table.find_all("tr")
-    max_cols = max(len(row.find_all(["th", "td"])) for row in rows)
-    
-    # Find header row: first row with <th> elements.
-    header = []
-    for row in rows:
-        ths = row.find_all("th", recursive=False)
-        if ths:
-            header = [th.get_text(strip=True) for th in ths]
-            break
-    print("\nDEBUG: Raw header row extracted:", header)
-    print("DEBUG: Maximum columns found in any row:", max_cols)
-    
-    if len(header) < max_cols:
-        header.extend([""] * (max_cols - len(header)))
-    
-    matrix = []
-    header_found = False
-    for row in rows:
-        if not header_found and row.find_all("th", recursive=False):
-            header_found = True
-            continue  # skip header row
-        cells = row.find_all(["td", "th"], recursive=False)
-        row_data = []
-        for i in range(max_cols):
-            if i < len(cells):
-                cell_text = cells[i].get_text(separator=" ", strip=True)
-            else:
-                cell_text = ""
-            row_data.append(cell_text)
-        matrix.append(row_data)
-    return header, matrix
-
 def filter_series_with_seed(series):
     pattern = r'^\(\d+\)'
     return series[series.str.match(pattern, na=False)].reset_index(drop=True)
@@ -99,99 +58,85 @@ def get_score_from_next_round(winner, next_round, df_main):
             break
     return ""
 
-def parse_fencer(s):
-    """
-    Given a string like "(48) PROKHODOV Kirill KAZ", returns a tuple (clean_name, seed, nationality)
-    where:
-      - clean_name is the fencer's name with the seed and nationality removed,
-      - seed is the number inside the parentheses,
-      - nationality is the 3-letter code at the end.
-    """
-    m = re.match(r'^\((\d+)\)\s*(.*?)\s+([A-Z]{3})$', s)
-    if m:
-        return m.group(2).strip(), m.group(1), m.group(3)
-    else:
-        m = re.match(r'^\((\d+)\)\s*(.*)$', s)
-        if m:
-            return m.group(2).strip(), m.group(1), ""
-        else:
-            return s, "", ""
-
 #####################################
 # PART 1: Open the page and get initial table data
 #####################################
+# `python tableau.py --profile` profiles each stage below (see profiling.py)
+profiler = script_profiler("tableau")
+profiler.start("navigate")
 edge_options = EdgeOptions()
 edge_options.use_chromium = True
 edge_options.add_argument("--headless")
 edge_options.add_argument("--disable-gpu")
 edge_service = Service(EdgeChromiumDriverManager().install())
-driver = webdriver.Edge(service=edge_service, options=edge_options)
-
-tableau_url = "https://www.fencingtimelive.com/tableaus/scores/0616226B518040E0AC71E85A2243B146/D0796928779645B18027D6F6CA3F4D65"
+# The bracket is read from page_source; selenium-wire only keeps the tableau pages
+# and they are cleared after each stage so a long session does not accumulate them.
+driver = webdriver.Edge(service=edge_service, options=edge_options, seleniumwire_options=WIRE_OPTIONS)
+driver.scopes = WIRE_SCOPES
+
+# FTL_BASE_URL can point the script at another host, e.g. a local mock_server.py
+BASE_URL = os.environ.get("FTL_BASE_URL", "https://www.fencingtimelive.com")
+EVENT_ID = "0616226B518040E0AC71E85A2243B146"
+tableau_url = BASE_URL + f"/tableaus/scores/{EVENT_ID}/D0796928779645B18027D6F6CA3F4D65"
 driver.get(tableau_url)
 time.sleep(10)
 
-initial_html = driver.page_source
-header_initial, matrix_initial = extract_full_bracket_table(initial_html)
-df_main = pd.DataFrame(matrix_initial, columns=header_initial)
-print("\nDEBUG: INITIAL FULL BRACKET TABLE:")
-print(df_main)
-print("Initial shape:", df_main.shape)
+# The assembler keeps every round column seen so far (keyed by round header) and
+# only parses the columns a new page reveals.
+assembler = BracketAssembler()
+print("DEBUG: Initial round columns:", assembler.add_page(driver.page_source))
 
 #####################################
-# PART 2: Press prevBut 3 times and add any new columns
+# PART 2: Press prevBut until the first round is reached (at most 3 times)
 #####################################
 for i in range(3):
+    before = assembler.last_headers
     try:
         prev_button = driver.find_element(By.ID, "prevBut")
         prev_button.click()
         print(f"Clicked 'prevBut' iteration {i+1}")
     except Exception as e:
         print(f"Error clicking 'prevBut' at iteration {i+1}: {e}")
+        break
     time.sleep(2)
-    updated_html = driver.page_source
-    header_new, matrix_new = extract_full_bracket_table(updated_html)
-    df_new = pd.DataFrame(matrix_new, columns=header_new)
-    print(f"\nDEBUG: Table after prevBut click {i+1}:")
-    print(df_new)
-    print("Shape:", df_new.shape)
-    for col in df_new.columns:
-        if col not in df_main.columns or df_main[col].eq("").all():
-            print(f"Adding column '{col}' from prevBut iteration {i+1}.")
-            series_to_add = df_new[col]
-            if isinstance(series_to_add, pd.DataFrame):
-                series_to_add = series_to_add.iloc[:, 0]
-            series_to_add = series_to_add.reindex(range(df_main.shape[0]), fill_value="")
-            df_main[col] = series_to_add
+    added = assembler.add_page(driver.page_source)
+    if assembler.last_headers == before:
+        print("Page unchanged; first round reached.")
+        break
+    print(f"Added columns {added} from prevBut iteration {i+1}.")
+del driver.requests
+check_memory("tableau prevBut stage")
 
 #####################################
-# PART 3: Press nextBut 6 times and add any new columns
+# PART 3: Press nextBut until the final is reached (at most 10 times)
 #####################################
-for i in range(6):
+# The first clicks may only show rounds already seen; keep going until the page stops changing.
+for i in range(10):
+    if assembler.final_reached:
+        print("Final round reached.")
+        break
+    before = assembler.last_headers
     try:
         next_button = driver.find_element(By.ID, "nextBut")
         next_button.click()
         print(f"Clicked 'nextBut' iteration {i+1}")
     except Exception as e:
         print(f"Error clicking 'nextBut' at iteration {i+1}: {e}")
+        break
     time.sleep(2)
-    updated_html = driver.page_source
-    header_new, matrix_new = extract_full_bracket_table(updated_html)
-    df_new = pd.DataFrame(matrix_new, columns=header_new)
-    print(f"\nDEBUG: Table after nextBut click {i+1}:")
-    print(df_new)
-    print("Shape:", df_new.shape)
-    for col in df_new.columns:
-        if col not in df_main.columns or df_main[col].eq("").all():
-            print(f"Adding column '{col}' from nextBut iteration {i+1}.")
-            series_to_add = df_new[col]
-            if isinstance(series_to_add, pd.DataFrame):
-                series_to_add = series_to_add.iloc[:, 0]
-            series_to_add = series_to_add.reindex(range(df_main.shape[0]), fill_value="")
-            df_main[col] = series_to_add
+    added = assembler.add_page(driver.page_source)
+    if assembler.last_headers == before:
+        print("Page unchanged; last round reached.")
+        break
+    print(f"Added columns {added} from nextBut iteration {i+1}.")
+del driver.requests
+check_memory("tableau nextBut stage")
 
 driver.quit()
 
+profiler.start("assemble")
+df_main = assembler.to_frame()
+
 # Drop any columns that are entirely empty
 df_main = df_main.dropna(axis=1, how='all')
 df_main = df_main.loc[:, ~(df_main == "").all()]
@@ -227,6 +172,7 @@ print("DEBUG: Final Headers:", rounds)
 print("Number of rounds (columns):", len(rounds))
 
 # Build final matches table (df_matches) from df_filtered.
+profiler.start("matches")
 final_matches = []
 num_rounds = len(rounds)
 for i, round_name in enumerate(rounds):
@@ -252,8 +198,7 @@ for i, round_name in enumerate(rounds):
                     winner = fencer2
                     score = get_score_from_next_round(fencer2, next_round, df_main)
                     break
-        else:
-            winner = fencer1 if fencer1 else fencer2
+        # No next round column: leave the winner empty rather than guess it.
         if "BYE" in fencer1 or "BYE" in fencer2:
             score = "BYE"
         final_matches.append({
@@ -310,47 +255,31 @@ print(df_matches)
 #####################################
 # PART 5: Create a Fencers Table (df_fencers)
 #####################################
-# For the first column only, each fencer string has the nationality at the end.
-# We build a dictionary of each fencer's Name, Nationality, and Seed.
-fencer_info = []
-def process_fencer(cell):
-    name, seed, nat = parse_fencer(cell)
-    return name, seed, nat
-
-# We process both Fencer1 and Fencer2 from df_matches.
-for idx, row in df_matches.iterrows():
-    f1_raw = row["Fencer1"]
-    f2_raw = row["Fencer2"]
-    name1, seed1, nat1 = process_fencer(f1_raw)
-    name2, seed2, nat2 = process_fencer(f2_raw)
-    # Update df_matches with clean names
-    df_matches.at[idx, "Fencer1"] = name1
-    df_matches.at[idx, "Fencer2"] = name2
-    df_matches.at[idx, "Fencer1_Nationality"] = nat1
-    df_matches.at[idx, "Fencer2_Nationality"] = nat2
-    fencer_info.append((name1, nat1, seed1))
-    fencer_info.append((name2, nat2, seed2))
-
-# Create a separate DataFrame for unique fencers.
-df_fencers = pd.DataFrame(list(set(fencer_info)), columns=["Name", "Nationality", "Seed"])
-
-# Remove rows where Nationality is blank (after stripping any spaces)
-df_fencers = df_fencers[df_fencers["Nationality"].str.strip() != ""]
-
-# Convert the Seed column to integers
-df_fencers["Seed"] = df_fencers["Seed"].astype(int)
-
-# Sort the DataFrame by Seed in ascending order and reset the index
-df_fencers = df_fencers.sort_values("Seed").reset_index(drop=True)
+# Split the raw "(seed) NAME NAT" strings of Fencer1/Fencer2 into clean names,
+# seeds and nationalities in one vectorized pass, then derive the unique fencers.
+profiler.start("fencers")
+df_matches = split_fencers(df_matches)
+df_fencers = build_fencers_table(df_matches)
 
 print(df_fencers)
 
-
-
-
-df_fencers = df_fencers.sort_values("Seed").reset_index(drop=True)
+# Convert both tables to the compact schema (categorical names/nations, small integer seeds).
+df_matches = compact_matches(df_matches)
+df_fencers = compact_fencers(df_fencers)
 
 print("\nFinal Matches Table (with clean names and nationalities):")
 print(df_matches)
 print("\nFencers Table (df_fencers):")
 print(df_fencers)
+print("\nMemory usage:")
+print(memory_report({"df_matches": df_matches, "df_fencers": df_fencers}))
+
+# With FTL_SNAPSHOT_DIR set, also append only the changed rows to the event's snapshot (see snapshot.py)
+if os.environ.get("FTL_SNAPSHOT_DIR"):
+    version, counts = SnapshotStore(os.environ["FTL_SNAPSHOT_DIR"]).write(
+        EVENT_ID, {"matches": df_matches, "fencers": df_fencers})
+    print(f"Snapshot version {version}:", counts)
+
+report = profiler.write()
+if report:
+    print(f"Profile written to {report}")